@@ -1,5 +1,9 @@
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 
@@ -17,22 +21,27 @@ if str(ROOT) not in sys.path:
 
 # Reuse your existing logic/components
 from src.rule_engine import load_config, audit_invoices  # reads config/audit_rules.yaml + pure engine
-from src.ai_auditor import load_auditor_brain  # loads HF model once
+from src.ai_auditor import (  # loads HF model once
+    load_brain_for_backend,
+    scan_notes_for_risk,
+    scan_options_from_config,
+    cache_from_config,
+)
+from src.ner_cache import DEFAULT_CACHE_PATH
+from src.ingest import load_table, ingest_cache_dir, content_hash
+from src.schema import INVOICE_SCHEMA, REQUIRED_COLUMNS  # central invoice schema (dtypes applied at ingestion)
+from src.incremental import fingerprint
+from src.vendor_index import as_vendor_index
+from src.telemetry import span, recorder_from_config
+from src.scan_jobs import BackgroundScan
+from src.evidence import evidence_settings, write_evidence_pack
+from src.findings_catalog import FindingsCatalog, catalog_settings
 
 
 # ----------------------------
 #  Guardrails
 # ----------------------------
 
-REQUIRED_COLUMNS = {
-    "InvoiceID",
-    "VendorID",
-    "VendorName",
-    "InvoiceAmount",
-    "PO_Amount",
-    "Notes",
-}
-
 DEFAULT_INVOICES_PATH = "data/raw_erp_dump/invoices.xlsx"
 DEFAULT_MASTER_PATH = "data/raw_erp_dump/vendor_master.csv"
 REPORT_DIR = "data/audit_reports"
@@ -46,103 +55,225 @@ def validate_invoices_df(df: pd.DataFrame) -> list[str]:
 def run_rule_engine(invoices: pd.DataFrame, master: pd.DataFrame, config: dict) -> dict:
     """
     UI-friendly version of your rule_engine.py:
-    - Ghost vendors via left join + indicator
+    - Ghost vendors via VendorIndex membership lookup (no join)
     - PO variance check via vectorized calc
     - High-value threshold flag
+    - Duplicate invoices (exact + near, sort-and-sweep per vendor)
+    Rules (and which are enabled) come from the compiled plan in src/rules.py.
+    Uses the engine's lean mode: only the displayed columns of flagged rows are built.
     """
     results = {}
 
     financial = config.get("financial_limits", {})
-    risk = config.get("risk_settings", {})
 
-    variance_limit = float(financial.get("max_po_variance", 0.10))
-    high_value_threshold = float(financial.get("high_value_threshold", 15000))
-    detect_ghosts = bool(risk.get("detect_ghost_vendors", True))
+    lean = audit_invoices(invoices, master, config, lean=True)
 
-    results["variance_limit"] = variance_limit
-    results["high_value_threshold"] = high_value_threshold
-    results["detect_ghost_vendors"] = detect_ghosts
+    results["variance_limit"] = float(financial.get("max_po_variance", 0.10))
+    results["high_value_threshold"] = float(financial.get("high_value_threshold", 15000))
+    results["detect_ghost_vendors"] = lean.plan.is_enabled("ghosts")
 
-    # --- Ghost vendor check (Anti-join pattern) ---
-    if detect_ghosts:
-        merged = invoices.merge(master, on="VendorID", how="left", indicator=True)
-        ghosts = merged[merged["_merge"] == "left_only"].copy()
-        results["ghosts"] = ghosts[["InvoiceID", "VendorID", "VendorName"]].reset_index(drop=True)
-    else:
-        results["ghosts"] = pd.DataFrame(columns=["InvoiceID", "VendorID", "VendorName"])
-
-    # --- PO variance check ---
-    safe = invoices.copy()
-    safe["Variance"] = (safe["InvoiceAmount"] - safe["PO_Amount"]).abs() / safe["PO_Amount"].replace(0, pd.NA)
-    variance_failures = safe[safe["Variance"] > variance_limit].copy()
-    results["variance_failures"] = variance_failures[
-        ["InvoiceID", "VendorID", "InvoiceAmount", "PO_Amount", "Variance"]
-    ].sort_values("Variance", ascending=False).reset_index(drop=True)
-
-    # --- High value flag ---
-    high_value = invoices[invoices["InvoiceAmount"] >= high_value_threshold].copy()
-    results["high_value"] = high_value[
-        ["InvoiceID", "VendorID", "InvoiceAmount", "VendorName"]
-    ].sort_values("InvoiceAmount", ascending=False).reset_index(drop=True)
+    # --- Ghost vendor check (hashed membership, only offending rows) ---
+    results["ghosts"] = lean.materialize(
+        "ghosts", columns=["InvoiceID", "VendorID", "VendorName", "ClosestVendor", "VendorSimilarity"]
+    ).reset_index(drop=True)
+
+    # --- PO variance check (Variance only computed for the flagged rows' output) ---
+    variance_failures = lean.materialize(
+        "failures", columns=["InvoiceID", "VendorID", "InvoiceAmount", "PO_Amount", "Variance"]
+    )
+    results["variance_failures"] = variance_failures.sort_values("Variance", ascending=False).reset_index(drop=True)
+
+    # --- High value flag (shares the numeric InvoiceAmount with the variance rule) ---
+    high_value = lean.materialize("high_value", columns=["InvoiceID", "VendorID", "InvoiceAmount", "VendorName"])
+    results["high_value"] = high_value.sort_values("InvoiceAmount", ascending=False).reset_index(drop=True)
+
+    # --- Duplicate invoices (later invoice of each pair, with the one it repeats) ---
+    results["duplicates"] = lean.materialize(
+        "duplicates",
+        columns=["InvoiceID", "VendorID", "InvoiceDate", "InvoiceAmount", "DuplicateOf", "DuplicateType"],
+    ).reset_index(drop=True)
 
     return results
 
 
 @st.cache_resource
-def get_cached_ner_pipeline():
+def get_cached_ner_pipeline(backend: str = "pytorch"):
     """
     performance:
     Loading transformers is expensive.
-    Cache it so it loads once per Streamlit session.
+    Cache it so it loads once per Streamlit session (per backend).
     """
-    return load_auditor_brain()
+    return load_brain_for_backend(backend)
 
 
-def run_ai_scan(invoices: pd.DataFrame) -> pd.DataFrame:
+@st.cache_resource
+def get_ner_result_cache(_config: dict, cache_path: str, backend: str):
+    """
+    One SQLite NER cache handle per cache file + backend, shared across reruns/sessions.
+    (cache_path/backend are the cache key; the config itself is not hashed.)
     """
-    Mirrors your ai_auditor.py behavior:
+    return cache_from_config(_config)
+
+
+def start_ai_scan(invoices: pd.DataFrame, config: dict) -> BackgroundScan:
+    """
+    Same scan as ai_auditor.py (shared implementation), started in the background:
     - detect PER entities with score > 0.85
-    - detect emails with '@' and '.'
-    Returns a findings dataframe.
+    - detect emails / phone numbers with regexes
+    - only possible names reach the model (ai_settings.prefilter)
+    - notes go through the model in batches (ai_settings.batch_size),
+      optionally across worker processes (ai_settings.workers)
+    - repeated notes are answered from the on-disk NER cache (ai_settings.cache_path)
+    Returns the running BackgroundScan; the UI polls its snapshot().
+    """
+    options = scan_options_from_config(config)  # batch_size, prefilter, workers, backend
+    cache_path = (config.get("ai_settings", {}) or {}).get("cache_path", DEFAULT_CACHE_PATH)
+    return BackgroundScan(
+        invoices,
+        recorder=recorder_from_config("dashboard_ai_scan", config),
+        column_name="Notes",
+        # only touched when something misses the cache
+        brain_loader=lambda: get_cached_ner_pipeline(options["backend"]),
+        cache=get_ner_result_cache(config, str(cache_path), options["backend"]),
+        **options,
+    ).start()
+
+
+def render_ai_scan():
     """
-    nlp = get_cached_ner_pipeline()
-    risky_rows = []
+    Progress, partial findings and a cancel button for the background scan.
+    Runs as a fragment polling every second while the scan is running, so only
+    this part of the page re-renders; a full rerun happens once when it finishes.
+    """
+    job = st.session_state["ai_job"]
+    snap = job.snapshot()
+
+    if snap["status"] == "running":
+        fraction = snap["done"] / snap["total"] if snap["total"] else 0.0
+        st.progress(
+            fraction,
+            text=f"🤖 FOIP/PII scan running: {snap['done']}/{snap['total']} notes through the model "
+                 f"({snap['elapsed_s']:.0f}s)",
+        )
+        if st.button("⏹️ Cancel AI scan"):
+            job.cancel()
+    elif st.session_state.get("ai_rendered_status") == "running":
+        # Finished since the page was drawn: refresh cards + evidence once
+        st.rerun()
+    elif snap["status"] == "cancelled":
+        st.warning(f"AI scan cancelled after {snap['done']}/{snap['total']} notes; showing partial findings.")
+    elif snap["status"] == "failed":
+        st.error(f"AI scan failed: {snap['error']}")
+
+    st.write("Text findings from AI + email/phone pattern rules.")
+    st.dataframe(snap["findings"], use_container_width=True)
 
-    for _, row in invoices.iterrows():
-        text_data = row.get("Notes", None)
 
-        if pd.isna(text_data) or not isinstance(text_data, str):
-            continue
+# ----------------------------
+# Caching (keyed by input content, not by rerun)
+# ----------------------------
+# Streamlit reruns the whole script on every widget interaction. Inputs are
+# parsed once per content hash, rule results are computed once per
+# (invoices, master, config) content, and evidence is only written when a
+# run actually happens -- never just because the page re-rendered.
 
-        entities = nlp(text_data)
-        found_risks = []
+EVIDENCE_INDEX_PATH = os.path.join(REPORT_DIR, "evidence_index.json")
 
-        for ent in entities:
-            if ent.get("entity_group") == "PER" and float(ent.get("score", 0)) > 0.85:
-                found_risks.append(f"NAME_DETECTED: {ent.get('word')}")
 
-        if "@" in text_data and "." in text_data:
-            found_risks.append("POSSIBLE_EMAIL")
+@st.cache_resource(max_entries=8)
+def load_input_table(_source, content_key: str, cache_dir, schema=None):
+    """
+    One parsed frame per input content (shared across reruns, not copied).
+    Callers must not modify it in place.
+    schema: the invoice schema types the frame once here (categorical keys, Arrow
+    strings, numeric amounts, parsed dates; see src/schema.py).
+    """
+    return load_table(_source, cache_dir=cache_dir, schema=schema)
 
-        if found_risks:
-            risky_rows.append(
-                {
-                    "InvoiceID": row.get("InvoiceID", "Unknown"),
-                    "RiskContent": text_data,
-                    "DetectedFlags": ", ".join(found_risks),
-                }
-            )
 
-    return pd.DataFrame(risky_rows)
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_rule_results(_invoices, _master, _config, invoices_key: str, master_key: str, config_key: str):
+    """run_rule_engine() memoized on the content hashes of its inputs."""
+    return run_rule_engine(_invoices, _master, _config)
 
 
-def save_report(df: pd.DataFrame, filename: str) -> str:
+def save_report_once(payload: bytes, prefix: str, timestamp: str) -> str:
+    """
+    Writes <prefix>_<timestamp>.csv unless a file with the same bytes was already
+    exported for this check (tracked by sha256 in evidence_index.json); returns the path either way.
+    """
     os.makedirs(REPORT_DIR, exist_ok=True)
-    path = os.path.join(REPORT_DIR, filename)
-    df.to_csv(path, index=False)
+    digest = hashlib.sha256(payload).hexdigest()
+
+    index = {}
+    if os.path.exists(EVIDENCE_INDEX_PATH):
+        with open(EVIDENCE_INDEX_PATH) as f:
+            index = json.load(f)
+    # Forget files that were deleted/moved since
+    index = {k: v for k, v in index.items() if os.path.exists(v)}
+
+    key = f"{prefix}:{digest}"
+    if key in index:
+        return index[key]
+
+    path = os.path.join(REPORT_DIR, f"{prefix}_{timestamp}.csv")
+    with open(path, "wb") as f:
+        f.write(payload)
+    index[key] = path
+    with open(EVIDENCE_INDEX_PATH, "w") as f:
+        json.dump(index, f, indent=2)
     return path
 
 
+def export_evidence(tables: dict, config: dict) -> dict:
+    """
+    Exports each finding table once per audit run.
+    Returns {name: {"path", "sha256"}}; the download buttons serve the exported
+    file's bytes (evidence_csv_bytes), so reruns never re-encode a table.
+    Tables are encoded concurrently; new content is also written in the other
+    evidence_settings.formats (parquet / zip) with a checksum manifest.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    settings = evidence_settings(config)
+    with ThreadPoolExecutor(max_workers=settings["workers"]) as pool:
+        payloads = dict(zip(tables, pool.map(lambda df: df.to_csv(index=False).encode("utf-8"), tables.values())))
+
+    evidence = {}
+    new_tables = {}
+    for prefix, payload in payloads.items():
+        path = save_report_once(payload, prefix, timestamp)
+        evidence[prefix] = {"path": path, "sha256": hashlib.sha256(payload).hexdigest()}
+        if path.endswith(f"_{timestamp}.csv"):
+            new_tables[prefix] = tables[prefix]
+
+    compressed = [f for f in settings["formats"] if f != "csv"]
+    if compressed and new_tables:
+        write_evidence_pack(new_tables, REPORT_DIR, formats=compressed, workers=settings["workers"], timestamp=timestamp)
+    return evidence
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def evidence_csv_bytes(path: str, sha256: str) -> bytes:
+    """An exported evidence CSV for its download button, read once per file (sha256 keys the content)."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@st.cache_resource
+def get_findings_catalog(path: str) -> FindingsCatalog:
+    """One catalog connection per file, shared across reruns/sessions."""
+    return FindingsCatalog(path)
+
+
+def update_findings_catalog(config: dict):
+    """Ingests the evidence just exported; returns the catalog."""
+    settings = catalog_settings(config)
+    catalog = get_findings_catalog(str(settings["path"]))
+    if settings["auto_ingest"]:
+        catalog.ingest_reports(REPORT_DIR)
+    return catalog
+
+
 # ----------------------------
 # Streamlit UI
 # ----------------------------
@@ -178,66 +309,108 @@ except Exception as e:
     st.stop()
 
 # --- Load data ---
-invoices_df = None
-master_df = None
+cache_dir = ingest_cache_dir(config)
 
 if use_sample:
     if not (os.path.exists(DEFAULT_INVOICES_PATH) and os.path.exists(DEFAULT_MASTER_PATH)):
         st.warning("Sample files not found. Run: python src/data_generator.py")
         st.stop()
-    invoices_df = pd.read_excel(DEFAULT_INVOICES_PATH)
-    master_df = pd.read_csv(DEFAULT_MASTER_PATH)
+    invoices_source, master_source = DEFAULT_INVOICES_PATH, DEFAULT_MASTER_PATH
 else:
-    if uploaded_invoices is not None:
-        invoices_df = pd.read_excel(uploaded_invoices)
-    if uploaded_master is not None:
-        master_df = pd.read_csv(uploaded_master)
-
-    if invoices_df is None or master_df is None:
+    invoices_source, master_source = uploaded_invoices, uploaded_master
+    if invoices_source is None or master_source is None:
         st.info("Upload both files (Invoices + Vendor Master), or toggle sample data on.")
         st.stop()
 
+# Content hashes: cheap for unchanged sample files (ingestion meta), one sha256 for uploads
+invoices_key = content_hash(invoices_source, cache_dir=cache_dir)
+master_key = content_hash(master_source, cache_dir=cache_dir)
+invoices_df = load_input_table(invoices_source, invoices_key, cache_dir, schema=INVOICE_SCHEMA)
+master_df = load_input_table(master_source, master_key, cache_dir)
+
 # --- Validate schema ---
 missing_cols = validate_invoices_df(invoices_df)
 if missing_cols:
     st.error(f"Invoices file is missing required columns: {missing_cols}")
     st.stop()
 
-# Convert numeric fields safely
-for col in ["InvoiceAmount", "PO_Amount"]:
-    invoices_df[col] = pd.to_numeric(invoices_df[col], errors="coerce")
-
 # ----------------------------
 # Run audits
 # ----------------------------
 if run_clicked:
-    with st.spinner("Running rule checks..."):
-        rule_results = run_rule_engine(invoices_df, master_df, config)
+    # A new run supersedes any scan still going from the previous one
+    previous_job = st.session_state.get("ai_job")
+    if previous_job is not None:
+        previous_job.cancel()
+
+    run_started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Stage timings for this run go to run_logs/ as a JSON run record
+    recorder = recorder_from_config("dashboard", config)
+    with recorder.activate() if recorder else nullcontext():
+        with st.spinner("Running rule checks..."):
+            with span("rules", rows=len(invoices_df)):
+                rule_results = cached_rule_results(
+                    invoices_df, master_df, config, invoices_key, master_key, fingerprint(config)
+                )
+
+        # Rule evidence is written here, once per run (identical content is not re-written)
+        with span("export"):
+            evidence = export_evidence(
+                {
+                    "ghost_vendors": rule_results["ghosts"],
+                    "po_variance": rule_results["variance_failures"],
+                    "high_value": rule_results["high_value"],
+                    "duplicate_invoices": rule_results["duplicates"],
+                },
+                config,
+            )
 
-    with st.spinner("Running FOIP/PII AI scan... (first run may download model)"):
-        ai_findings = run_ai_scan(invoices_df)
+        # Earlier runs that already flagged this run's ghost vendors
+        with span("catalog"):
+            catalog = update_findings_catalog(config)
+            ghost_history = catalog.flagged_before(rule_results["ghosts"]["VendorID"], before=run_started)
+
+    # The AI scan runs on a worker thread; results stream into the FOIP/PII tab
+    st.session_state["ai_job"] = start_ai_scan(invoices_df, config)
+    st.session_state["ai_exported"] = False
 
     # Store in session state (so UI doesn't wipe results)
     st.session_state["rule_results"] = rule_results
-    st.session_state["ai_findings"] = ai_findings
+    st.session_state["evidence"] = evidence
+    st.session_state["ghost_history"] = ghost_history
     st.session_state["ran_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if recorder is not None:
+        recorder.save()
+        st.session_state["run_stages"] = recorder.stage_totals()
+
+# AI evidence is exported once, when the background scan has completed
+ai_job = st.session_state.get("ai_job")
+if ai_job is not None and ai_job.finished and not st.session_state.get("ai_exported"):
+    snap = ai_job.snapshot()
+    if snap["status"] == "done":
+        st.session_state["evidence"].update(export_evidence({"foip_ai_findings": snap["findings"]}, config))
+        update_findings_catalog(config)
+    st.session_state["ai_exported"] = True
 
 # ----------------------------
 # Render results (if present)
 # ----------------------------
 if "rule_results" in st.session_state:
     rule_results = st.session_state["rule_results"]
-    ai_findings = st.session_state["ai_findings"]
+    ai_snapshot = st.session_state["ai_job"].snapshot()
+    st.session_state["ai_rendered_status"] = ai_snapshot["status"]
     ran_at = st.session_state.get("ran_at", "")
 
     st.subheader("📌 Audit Summary")
     st.caption(f"Last run: {ran_at}")
 
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
 
     ghosts = rule_results["ghosts"]
     variance_failures = rule_results["variance_failures"]
     high_value = rule_results["high_value"]
+    duplicates = rule_results["duplicates"]
 
     def status_card(col, label, count, pass_if_zero=True):
         ok = (count == 0) if pass_if_zero else (count > 0)
@@ -254,7 +427,12 @@ if "rule_results" in st.session_state:
     status_card(col1, "Ghost Vendors", len(ghosts), pass_if_zero=True)
     status_card(col2, "PO Variance Breaches", len(variance_failures), pass_if_zero=True)
     status_card(col3, "High-Value Invoices", len(high_value), pass_if_zero=False)
-    status_card(col4, "FOIP/PII Findings", len(ai_findings), pass_if_zero=True)
+    status_card(col4, "Duplicate Invoices", len(duplicates), pass_if_zero=True)
+    if ai_snapshot["status"] == "running":
+        col5.metric("FOIP/PII Findings", f"{len(ai_snapshot['findings'])}+")
+        col5.info("Scanning... ⏳")
+    else:
+        status_card(col5, "FOIP/PII Findings", len(ai_snapshot["findings"]), pass_if_zero=True)
 
     st.divider()
 
@@ -267,15 +445,41 @@ if "rule_results" in st.session_state:
         }
     )
 
+    if st.session_state.get("run_stages"):
+        with st.expander("⏱️ Run timings"):
+            st.dataframe(
+                pd.DataFrame.from_dict(st.session_state["run_stages"], orient="index"),
+                use_container_width=True,
+            )
+
+    with st.expander("🗂️ Findings history"):
+        st.caption("Every earlier run's findings, from the findings catalog (catalog_settings).")
+        lookup_col1, lookup_col2 = st.columns(2)
+        vendor_lookup = lookup_col1.text_input("VendorID")
+        invoice_lookup = lookup_col2.text_input("InvoiceID")
+        if vendor_lookup or invoice_lookup:
+            catalog = get_findings_catalog(str(catalog_settings(config)["path"]))
+            history = catalog.findings(
+                vendor_id=vendor_lookup or None, invoice_id=invoice_lookup or None, limit=500
+            )
+            st.dataframe(history.drop(columns="record"), use_container_width=True)
+
     st.divider()
 
-    tab1, tab2, tab3, tab4 = st.tabs(
-        ["Ghost Vendors", "PO Variance", "High Value", "FOIP/PII Findings"]
+    tab1, tab2, tab3, tab_dup, tab4 = st.tabs(
+        ["Ghost Vendors", "PO Variance", "High Value", "Duplicates", "FOIP/PII Findings"]
     )
 
     with tab1:
-        st.write("Invoices referencing VendorIDs not found in the master list.")
+        st.write(
+            "Invoices referencing VendorIDs not found in the master list. "
+            "ClosestVendor: the legitimate vendor the ID (or name) most resembles, if any."
+        )
         st.dataframe(ghosts, use_container_width=True)
+        ghost_history = st.session_state.get("ghost_history")
+        if ghost_history is not None and len(ghost_history):
+            st.warning(f"{len(ghost_history)} of these vendors were already flagged in earlier runs.")
+            st.dataframe(ghost_history, use_container_width=True)
 
     with tab2:
         st.write("Invoices where abs(InvoiceAmount - PO_Amount) / PO_Amount exceeds threshold.")
@@ -285,51 +489,39 @@ if "rule_results" in st.session_state:
         st.write("Invoices at/above the configured high value threshold.")
         st.dataframe(high_value, use_container_width=True)
 
+    with tab_dup:
+        st.write("Same VendorID + amount (exact), or similar amounts within the configured date window (near).")
+        st.dataframe(duplicates, use_container_width=True)
+
     with tab4:
-        st.write("Text findings from AI + simple email heuristic.")
-        st.dataframe(ai_findings, use_container_width=True)
+        # Polls while the scan runs; static once it is done
+        st.fragment(render_ai_scan, run_every=1.0 if ai_snapshot["status"] == "running" else None)()
 
     st.divider()
 
     st.subheader("📤 Export Evidence (CSV)")
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    # Save files to data/audit_reports + also offer browser download
-    ghost_path = save_report(ghosts, f"ghost_vendors_{timestamp}.csv")
-    var_path = save_report(variance_failures, f"po_variance_{timestamp}.csv")
-    hv_path = save_report(high_value, f"high_value_{timestamp}.csv")
-    ai_path = save_report(ai_findings, f"foip_ai_findings_{timestamp}.csv")
-
-    c1, c2, c3, c4 = st.columns(4)
-
-    with c1:
-        st.download_button(
-            "Download Ghost Vendors CSV",
-            data=ghosts.to_csv(index=False).encode("utf-8"),
-            file_name=os.path.basename(ghost_path),
-            mime="text/csv",
-        )
-    with c2:
-        st.download_button(
-            "Download PO Variance CSV",
-            data=variance_failures.to_csv(index=False).encode("utf-8"),
-            file_name=os.path.basename(var_path),
-            mime="text/csv",
-        )
-    with c3:
-        st.download_button(
-            "Download High Value CSV",
-            data=high_value.to_csv(index=False).encode("utf-8"),
-            file_name=os.path.basename(hv_path),
-            mime="text/csv",
-        )
-    with c4:
-        st.download_button(
-            "Download FOIP/PII CSV",
-            data=ai_findings.to_csv(index=False).encode("utf-8"),
-            file_name=os.path.basename(ai_path),
-            mime="text/csv",
-        )
+    # Exported once when the audit ran; reruns only re-render the buttons
+    evidence = st.session_state["evidence"]
+    st.caption("Saved to: " + ", ".join(f"`{e['path']}`" for e in evidence.values()))
+
+    labels = {
+        "ghost_vendors": "Download Ghost Vendors CSV",
+        "po_variance": "Download PO Variance CSV",
+        "high_value": "Download High Value CSV",
+        "duplicate_invoices": "Download Duplicates CSV",
+        "foip_ai_findings": "Download FOIP/PII CSV",
+    }
+    for col, (name, label) in zip(st.columns(len(labels)), labels.items()):
+        with col:
+            if name not in evidence:
+                st.button(label, disabled=True, help="Exported when the AI scan completes.")
+                continue
+            st.download_button(
+                label,
+                data=evidence_csv_bytes(evidence[name]["path"], evidence[name]["sha256"]),
+                file_name=os.path.basename(evidence[name]["path"]),
+                mime="text/csv",
+            )
 
 else:
     st.info("Click **Run Audit** in the sidebar to generate the dashboard.")
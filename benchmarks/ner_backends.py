@@ -0,0 +1,176 @@
+"""
+NER backend comparison harness.
+
+Runs the same Notes through every inference backend of load_auditor_brain()
+(pytorch / int8 / onnx), each in a fresh process so RSS numbers are not
+polluted by the previous model, and reports:
+
+- agreement with the pytorch baseline on PER detections (per-note + per-mention)
+- model load time, scan latency per note, peak RSS
+
+Scans go through scan_notes_for_risk() (dedupe, length bucketing, long-note
+windows), the same path the CLI and dashboard run.
+
+Usage:
+    python benchmarks/ner_backends.py
+    python benchmarks/ner_backends.py --backends pytorch int8 --rows 2000 --json data/benchmarks/ner_backends.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+
+from src import ai_auditor
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def per_detections(entities_per_note, threshold=ai_auditor.PER_SCORE_THRESHOLD):
+    """One frozenset of detected PER words per note (what NAME_DETECTED would report)."""
+    return [
+        frozenset(
+            str(e.get("word"))
+            for e in ents
+            if e.get("entity_group") == "PER" and float(e.get("score", 0)) > threshold
+        )
+        for ents in entities_per_note
+    ]
+
+
+def agreement(baseline, candidate) -> dict:
+    """Per-note exact agreement plus mention-level precision/recall against the baseline."""
+    same = sum(1 for b, c in zip(baseline, candidate) if b == c)
+    tp = sum(len(b & c) for b, c in zip(baseline, candidate))
+    base_total = sum(len(b) for b in baseline)
+    cand_total = sum(len(c) for c in candidate)
+    return {
+        "note_agreement": same / len(baseline) if baseline else 1.0,
+        "per_precision": tp / cand_total if cand_total else 1.0,
+        "per_recall": tp / base_total if base_total else 1.0,
+    }
+
+
+class _CaptureEntities:
+    """Stands in for the NerCache: answers nothing, keeps every note's entities the scan produces."""
+
+    def __init__(self):
+        self.entities = {}
+
+    def get_many(self, texts):
+        return {}
+
+    def put_many(self, results):
+        self.entities.update(results)
+
+
+def _scan(nlp, texts, batch_size, backend):
+    """Entities per text from the production scan path."""
+    capture = _CaptureEntities()
+    ai_auditor.scan_notes_for_risk(
+        pd.DataFrame({"Notes": texts}), nlp=nlp, batch_size=batch_size, cache=capture, backend=backend
+    )
+    return [capture.entities.get(t, []) for t in texts]
+
+
+def _measure_backend(backend, texts, batch_size):
+    """Runs in a child process: load one backend, scan all texts, report timings + detections."""
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    nlp = ai_auditor.load_brain_for_backend(backend)
+    load_s = time.perf_counter() - start
+
+    # Warm-up so one-off graph/kernel setup is not billed to the scan
+    _scan(nlp, texts[: min(len(texts), batch_size)], batch_size, backend)
+
+    start = time.perf_counter()
+    entities = _scan(nlp, texts, batch_size, backend)
+    scan_s = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "scan_s": scan_s,
+        "ms_per_note": 1000 * scan_s / max(len(texts), 1),
+        "notes_per_s": len(texts) / scan_s if scan_s else float("inf"),
+        "peak_rss_mb": peak_rss_mb(),
+        "model_rss_mb": peak_rss_mb() - rss_before,
+        "detections": [sorted(d) for d in per_detections(entities)],
+    }
+
+
+def load_sample_notes(input_path, rows):
+    """Notes from an existing invoice dump, or freshly generated ones."""
+    if input_path and os.path.exists(input_path):
+        df = pd.read_excel(input_path) if input_path.endswith(".xlsx") else pd.read_csv(input_path)
+    else:
+        from src.data_generator import generate_erp_data
+        df = generate_erp_data(rows)
+    notes = df["Notes"][df["Notes"].map(lambda v: isinstance(v, str))]
+    return notes.head(rows).tolist()
+
+
+def compare_backends(texts, backends, batch_size=ai_auditor.DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+    ctx = multiprocessing.get_context("spawn")
+    runs = {}
+    for backend in backends:
+        print(f"⏱️  Measuring backend={backend} on {len(texts)} notes...")
+        with ctx.Pool(1) as pool:
+            runs[backend] = pool.apply(_measure_backend, (backend, texts, batch_size))
+
+    baseline_name = "pytorch" if "pytorch" in runs else backends[0]
+    baseline = [frozenset(d) for d in runs[baseline_name]["detections"]]
+    base_run = runs[baseline_name]
+
+    rows = []
+    for backend, run in runs.items():
+        detections = [frozenset(d) for d in run["detections"]]
+        rows.append(
+            {
+                "backend": backend,
+                **agreement(baseline, detections),
+                "load_s": round(run["load_s"], 2),
+                "ms_per_note": round(run["ms_per_note"], 2),
+                "notes_per_s": round(run["notes_per_s"], 1),
+                "speedup_vs_baseline": round(base_run["scan_s"] / run["scan_s"], 2) if run["scan_s"] else None,
+                "peak_rss_mb": round(run["peak_rss_mb"], 1),
+                "rss_saving_mb": round(base_run["peak_rss_mb"] - run["peak_rss_mb"], 1),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare NER inference backends against the pytorch baseline.")
+    parser.add_argument("--backends", nargs="+", default=list(ai_auditor.BACKENDS), choices=ai_auditor.BACKENDS)
+    parser.add_argument("--input", default="data/raw_erp_dump/invoices.xlsx")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=ai_auditor.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--json", default=None, help="Also write the comparison table to this JSON file.")
+    args = parser.parse_args()
+
+    texts = load_sample_notes(args.input, args.rows)
+    report = compare_backends(texts, args.backends, batch_size=args.batch_size)
+
+    print("\n📊 Backend comparison (baseline = pytorch):")
+    print(report.to_string(index=False))
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report.to_dict(orient="records"), f, indent=2)
+        print(f"\n📄 Saved: {args.json}")
@@ -0,0 +1,309 @@
+"""
+Audit pipeline benchmark suite.
+
+Builds deterministic invoice dumps with the data generator (1k .. 10M rows,
+large sizes via its vectorized bulk mode) and measures every stage of a run
+on each size:
+
+- ingest_cold / ingest_warm   load_table() on a fresh vs. populated ingestion cache
+- audit_invoices / audit_lean the rule plan, full and lean result modes
+- export_findings             evidence CSVs for the rule findings
+- scan_notes                  scan_notes_for_risk() with a deterministic NER stub
+                              (no model download, runs offline, same output every time)
+
+Per stage: wall-clock latency (median/min/max over --repeat runs), rows/sec and
+peak traced memory (a separate tracemalloc run, so tracing never skews the timings).
+Results are written as JSON together with the git commit, so two runs can be
+diffed with --compare.
+
+Usage:
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --sizes 1000 100000 1000000 --repeat 3
+    python benchmarks/pipeline.py --sizes 10000000 --stages audit_invoices audit_lean
+    python benchmarks/pipeline.py --compare data/benchmarks/pipeline_<earlier>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from src import ai_auditor
+from src.ingest import load_table
+from src.rule_engine import audit_invoices, export_findings
+from src.vendor_index import VendorIndex
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STAGES = ("ingest_cold", "ingest_warm", "audit_invoices", "audit_lean", "export_findings", "scan_notes")
+DEFAULT_OUT_DIR = "data/benchmarks"
+DEFAULT_SEED = 101
+
+# Above this size datasets come from the vectorized bulk generator
+# (row-by-row Faker generation would dominate the benchmark run).
+BULK_THRESHOLD = 50_000
+# Excel sheets stop at 1,048,576 rows; larger dumps are benchmarked as CSV.
+EXCEL_MAX_ROWS = 200_000
+
+BENCH_CONFIG = {
+    "financial_limits": {"max_po_variance": 0.10, "high_value_threshold": 15000},
+    "risk_settings": {"detect_ghost_vendors": True},
+}
+
+
+# ----------------------------
+# Deterministic inputs
+# ----------------------------
+def build_dataset(rows, seed=DEFAULT_SEED, bulk_threshold=BULK_THRESHOLD) -> pd.DataFrame:
+    """Same seed + rows -> identical frame, on every machine and every commit."""
+    from faker import Faker
+    from src import data_generator
+
+    if rows > bulk_threshold:
+        # Fixed "today" so InvoiceDate does not drift between runs
+        pools = data_generator.build_string_pools(seed)
+        return data_generator.generate_erp_data_bulk(rows, seed=seed, pools=pools, today=date(2025, 1, 1))
+
+    random.seed(seed)
+    Faker.seed(seed)
+    return data_generator.generate_erp_data(rows)
+
+
+def build_master() -> pd.DataFrame:
+    from src.data_generator import VALID_VENDORS
+    return pd.DataFrame({"VendorID": VALID_VENDORS, "Status": "Active"})
+
+
+class StubNER:
+    """
+    Offline stand-in for the HF pipeline: tags capitalised words from the
+    first-name gazetteer as PER (score 0.99). Accepts one text or a batch,
+    like the real pipeline, so batching code paths are exercised too.
+    """
+
+    _word = re.compile(r"\b[A-Z][a-z]+\b")
+
+    def __init__(self):
+        self.names = {n.capitalize() for n in ai_auditor.FIRST_NAME_GAZETTEER}
+        self.calls = 0
+
+    def _tag(self, text):
+        return [
+            {"entity_group": "PER", "score": 0.99, "word": m.group(0), "start": m.start(), "end": m.end()}
+            for m in self._word.finditer(str(text))
+            if m.group(0) in self.names
+        ]
+
+    def __call__(self, texts, batch_size=None):
+        self.calls += 1
+        if isinstance(texts, list):
+            return [self._tag(t) for t in texts]
+        return self._tag(texts)
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn, rows, repeat=1, setup=None) -> dict:
+    """
+    Times fn() `repeat` times (setup() runs untimed before each call), then
+    once more under tracemalloc for the peak. Returns latency/throughput/memory.
+    """
+    timings = []
+    for _ in range(max(repeat, 1)):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "rows": int(rows),
+        "latency_s": {"median": median, "min": min(timings), "max": max(timings), "runs": len(timings)},
+        "rows_per_s": rows / median if median else None,
+        "peak_mem_mb": peak / (1024 * 1024),
+    }
+
+
+def benchmark_size(rows, stages=STAGES, repeat=1, seed=DEFAULT_SEED, work_dir=None, ner_batch_size=32) -> list:
+    """Runs the selected stages on one dataset size; returns one record per stage."""
+    print(f"🧬 Building dataset: {rows:,} invoices (seed={seed})...")
+    invoices = build_dataset(rows, seed=seed)
+    vendors = VendorIndex.from_master(build_master())
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="audit_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    ext = ".xlsx" if rows <= EXCEL_MAX_ROWS else ".csv"
+    source = os.path.join(work_dir, f"invoices_{rows}{ext}")
+    cache_dir = os.path.join(work_dir, "ingest_cache")
+    out_dir = os.path.join(work_dir, "reports")
+
+    if {"ingest_cold", "ingest_warm"} & set(stages):
+        if ext == ".xlsx":
+            invoices.to_excel(source, index=False)
+        else:
+            invoices.to_csv(source, index=False)
+
+    def clear_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results = audit_invoices(invoices, vendors, BENCH_CONFIG)
+    runners = {
+        "ingest_cold": (lambda: load_table(source, cache_dir=cache_dir), clear_cache),
+        "ingest_warm": (lambda: load_table(source, cache_dir=cache_dir), None),
+        "audit_invoices": (lambda: audit_invoices(invoices, vendors, BENCH_CONFIG), None),
+        "audit_lean": (lambda: audit_invoices(invoices, vendors, BENCH_CONFIG, lean=True).evaluate_all(), None),
+        "export_findings": (lambda: export_findings(results["ghosts"], results["failures"], out_dir=out_dir), None),
+        "scan_notes": (
+            lambda: ai_auditor.scan_notes_for_risk(invoices, nlp=StubNER(), batch_size=ner_batch_size),
+            None,
+        ),
+    }
+
+    records = []
+    for stage in stages:
+        fn, setup = runners[stage]
+        if stage == "ingest_warm":
+            fn()  # populate the cache once
+        print(f"⏱️  {stage} @ {rows:,} rows...")
+        record = {"stage": stage, "input": ext.lstrip(".") if stage.startswith("ingest") else "frame"}
+        record.update(measure(fn, rows, repeat=repeat, setup=setup))
+        records.append(record)
+        print(f"   {record['latency_s']['median']:.3f}s  "
+              f"{record['rows_per_s'] or 0:,.0f} rows/s  peak {record['peak_mem_mb']:.1f} MB")
+    return records
+
+
+def run_suite(sizes=DEFAULT_SIZES, stages=STAGES, repeat=1, seed=DEFAULT_SEED, ner_batch_size=32) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="audit_bench_")
+    try:
+        records = []
+        for rows in sizes:
+            records.extend(
+                benchmark_size(rows, stages=stages, repeat=repeat, seed=seed,
+                               work_dir=os.path.join(work_dir, str(rows)), ner_batch_size=ner_batch_size)
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "suite": "audit_pipeline",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {"sizes": list(sizes), "stages": list(stages), "repeat": repeat, "seed": seed,
+                   "ner": "stub", "ner_batch_size": ner_batch_size},
+        "results": records,
+    }
+
+
+def compare(current: dict, baseline: dict) -> pd.DataFrame:
+    """Median latency of each (stage, rows) now vs. the baseline file (ratio > 1 = slower)."""
+    def table(report):
+        return {(r["stage"], r["rows"]): r for r in report["results"]}
+
+    before, after = table(baseline), table(current)
+    rows = []
+    for key in sorted(set(before) & set(after), key=lambda k: (k[1], STAGES.index(k[0]) if k[0] in STAGES else 0)):
+        b, a = before[key], after[key]
+        rows.append(
+            {
+                "stage": key[0],
+                "rows": key[1],
+                "baseline_s": round(b["latency_s"]["median"], 4),
+                "current_s": round(a["latency_s"]["median"], 4),
+                "latency_ratio": round(a["latency_s"]["median"] / b["latency_s"]["median"], 2)
+                if b["latency_s"]["median"] else None,
+                "mem_ratio": round(a["peak_mem_mb"] / b["peak_mem_mb"], 2) if b["peak_mem_mb"] else None,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def summary_table(report: dict) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "stage": r["stage"],
+                "rows": r["rows"],
+                "median_s": round(r["latency_s"]["median"], 4),
+                "rows_per_s": round(r["rows_per_s"] or 0),
+                "peak_mem_mb": round(r["peak_mem_mb"], 1),
+            }
+            for r in report["results"]
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every audit pipeline stage on generated datasets.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES),
+                        help="Invoice counts to benchmark (e.g. 1000 10000 1000000 10000000).")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage (median is reported).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--ner-batch-size", type=int, default=32)
+    parser.add_argument("--json", default=None,
+                        help=f"Results file (default: {DEFAULT_OUT_DIR}/pipeline_<timestamp>.json).")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.stages, repeat=args.repeat, seed=args.seed,
+                       ner_batch_size=args.ner_batch_size)
+
+    print("\n📊 Pipeline benchmark:")
+    print(summary_table(report).to_string(index=False))
+
+    out_path = args.json or os.path.join(DEFAULT_OUT_DIR, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Saved: {out_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n🔁 Compared with {args.compare} (commit {baseline.get('git_commit')}):")
+        print(compare(report, baseline).to_string(index=False))
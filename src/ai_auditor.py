@@ -3,87 +3,589 @@ import pandas as pd
 import warnings
 warnings.filterwarnings("ignore", message="urllib3 v2 only supports OpenSSL")
 
+import argparse
+import math
+import multiprocessing
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import sys
+import time
+from pathlib import Path
+
+# Allow `python src/ai_auditor.py` as well as `from src import ai_auditor`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.rule_engine import load_config
+from src.ingest import load_table, ingest_cache_dir
+from src.schema import INVOICE_SCHEMA
+from src.evidence import evidence_settings, write_evidence_pack
+from src.findings_catalog import update_catalog
+from src.ner_cache import NerCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from src.telemetry import span, recorder_from_config, parse_profile_args
+from src.ner_batching import (
+    DEFAULT_MAX_TOKENS, DEFAULT_WINDOW_OVERLAP, TokenLayouts, iter_ner_bucketed, run_ner_bucketed,
+)
+from src.scan_service import CLIENT_CHUNK, ServiceUnavailable, connect_service, service_settings
+
+# Shared scan settings (the dashboard imports these so both entry points agree)
+MODEL_ID = "dslim/bert-base-NER"
+PER_SCORE_THRESHOLD = 0.85
+DEFAULT_BATCH_SIZE = 32
+# Minimum seconds between progress callbacks (each one rebuilds the partial findings)
+PROGRESS_INTERVAL_S = 0.5
+
+# Inference backends behind load_auditor_brain():
+#  - pytorch: full-precision HF pipeline (the original behaviour)
+#  - int8:    same model with Linear layers dynamically quantized to int8
+#  - onnx:    model exported once to ONNX and run with onnxruntime (needs `optimum[onnxruntime]`)
+BACKENDS = ("pytorch", "int8", "onnx")
+DEFAULT_BACKEND = "pytorch"
+ONNX_EXPORT_DIR = "data/cache/onnx"
+AI_FINDINGS_PATH = "data/audit_reports/ai_risk_findings.csv"
+
+# Stage-1 detectors (cheap, compiled once, run over the whole column in one pass)
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(
+    r"(?<!\d)(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?:\s*(?:x|ext\.?)\s*\d{1,5})?(?!\d)"
+)
+
+# Common first names. Matched case-insensitively as whole tokens, so
+# "john@gmail.com" and "jane.roe" still count as a possible name.
+FIRST_NAME_GAZETTEER = (
+    "aaron adam alex alexander alice amanda amy andrew angela anna anthony ashley "
+    "barbara ben benjamin betty brian carol catherine charles chris christopher "
+    "daniel david deborah dennis donald donna dorothy edward elizabeth emily emma "
+    "eric frank gary george helen jack james jane jason jeff jennifer jessica jim "
+    "joe john joseph joshua julie karen kathleen kevin kimberly laura linda lisa "
+    "mark mary matthew melissa michael michelle mike nancy nicole olivia patricia "
+    "paul peter rachel rebecca richard robert ronald ryan sandra sarah scott "
+    "sharon sophia stephanie steven susan thomas timothy tom william"
+).split()
+
+# A note "might contain a person's name" if it has:
+#  - two Title-case words in a row ("John Smith"),
+#  - an honorific ("Mr. Smith", "Dr Patel"),
+#  - a Title-case word right after a lowercase word ("discuss with Smith"),
+#  - or any gazetteer first name, in any case.
+NAME_HINT_RE = re.compile(
+    r"\b[A-Z][a-z'\-]+\s+[A-Z][a-z'\-]+\b"
+    r"|\b(?:Mr|Mrs|Ms|Miss|Dr|Prof)\.?\s+[A-Z]"
+    r"|\b[a-z]+,?\s+[A-Z][a-z'\-]+"
+    r"|(?i:\b(?:" + "|".join(FIRST_NAME_GAZETTEER) + r")\b)"
+)
 
 # 1. MODEL LOADER
 # We wrap this in a function so we don't load the massive brain unless we need it.
-def load_auditor_brain():
-    from transformers import pipeline
+def load_auditor_brain(backend=DEFAULT_BACKEND):
     """
     Initializes the Named Entity Recognition (NER) pipeline.
     Uses a standard BERT model fine-tuned for entity detection.
+
+    backend picks how the model runs on CPU (see BACKENDS); every backend
+    returns the same callable pipeline interface.
     """
-    print(" Waking up the AI Auditor (Loading Model)...")
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ Unknown NER backend {backend!r}. Choose one of: {', '.join(BACKENDS)}")
+
+    from transformers import pipeline
+
+    print(f" Waking up the AI Auditor (Loading Model, backend={backend})...")
     # We use a specific model 'dslim/bert-base-NER' known for good performance
-    pii_identifier = pipeline("ner", model="dslim/bert-base-NER", aggregation_strategy="simple")
-    return pii_identifier
+    if backend == "pytorch":
+        return pipeline("ner", model=MODEL_ID, aggregation_strategy="simple")
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+
+    if backend == "int8":
+        import torch
+        from transformers import AutoModelForTokenClassification
+
+        model = AutoModelForTokenClassification.from_pretrained(MODEL_ID)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+
+    # backend == "onnx": export once, then reuse the exported graph from disk
+    try:
+        from optimum.onnxruntime import ORTModelForTokenClassification
+    except ImportError as e:
+        raise ImportError("❌ The onnx backend needs: pip install 'optimum[onnxruntime]'") from e
+
+    export_dir = os.path.join(ONNX_EXPORT_DIR, MODEL_ID.replace("/", "__"))
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model = ORTModelForTokenClassification.from_pretrained(export_dir)
+    else:
+        print(f"   Exporting {MODEL_ID} to ONNX (one-time) -> {export_dir}")
+        model = ORTModelForTokenClassification.from_pretrained(MODEL_ID, export=True)
+        model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+    return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+
+
+def load_brain_for_backend(backend=DEFAULT_BACKEND):
+    """
+    Calls load_auditor_brain, passing the backend only when it is not the default
+    (so drop-in replacements of load_auditor_brain() keep working).
+    """
+    if backend in (None, DEFAULT_BACKEND):
+        return load_auditor_brain()
+    return load_auditor_brain(backend=backend)
+
+
+def model_tag(backend=DEFAULT_BACKEND):
+    """Model id used in cache keys; quantized/exported backends get their own entries."""
+    return MODEL_ID if backend in (None, DEFAULT_BACKEND) else f"{MODEL_ID}+{backend}"
 
 # 2. SCANNING LOGIC
-def scan_notes_for_risk(df, column_name="Notes"):
+# Each pool worker keeps its own pipeline (and tokenizer layouts) here, loaded once in the initializer.
+_WORKER_NLP = None
+_WORKER_LAYOUTS = None
+
+
+def _init_scan_worker(threads_per_worker, backend=DEFAULT_BACKEND, max_tokens=DEFAULT_MAX_TOKENS,
+                      window_overlap=DEFAULT_WINDOW_OVERLAP):
+    """
+    Process-pool initializer: pin thread counts, then load the model once per worker.
+    The env vars must be set before torch is imported to take effect.
+    """
+    global _WORKER_NLP, _WORKER_LAYOUTS
+    os.environ["OMP_NUM_THREADS"] = str(int(threads_per_worker))
+    os.environ["MKL_NUM_THREADS"] = str(int(threads_per_worker))
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    try:
+        import torch
+        torch.set_num_threads(int(threads_per_worker))
+    except ImportError:
+        pass
+    _WORKER_NLP = load_brain_for_backend(backend)
+    _WORKER_LAYOUTS = TokenLayouts(_WORKER_NLP, max_tokens=max_tokens, overlap=window_overlap)
+
+
+def _scan_shard(shard):
+    texts, batch_size = shard
+    return run_ner_bucketed(_WORKER_NLP, texts, batch_size, _WORKER_LAYOUTS)
+
+
+def run_ner_parallel(
+    texts, workers, batch_size=DEFAULT_BATCH_SIZE, threads_per_worker=None, mp_context="spawn", backend=DEFAULT_BACKEND,
+    on_shard=None, cancel=None, max_tokens=DEFAULT_MAX_TOKENS, window_overlap=DEFAULT_WINDOW_OVERLAP,
+):
+    """
+    Splits `texts` into contiguous shards and runs them on a pool of worker processes.
+    Results come back in the same order as `texts`.
+
+    - threads_per_worker defaults to cores // workers, so the pool never oversubscribes.
+    - mp_context "spawn" keeps torch happy; tests can use "fork".
+    - on_shard(texts, entities) is called as each shard (in order) completes.
+    - cancel: threading.Event; once set, queued shards are dropped and only the
+      results of the leading completed shards are returned (a prefix of `texts`).
+    - max_tokens / window_overlap: long-note windowing inside each worker
+      (see src/ner_batching.py); shards are length-bucketed there too.
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    # A few shards per worker keeps the pool busy when shard costs differ.
+    shard_size = max(batch_size or 1, math.ceil(len(texts) / (workers * 4)))
+    shards = [(texts[i:i + shard_size], batch_size) for i in range(0, len(texts), shard_size)]
+
+    ctx = multiprocessing.get_context(mp_context)
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(shards)),
+        mp_context=ctx,
+        initializer=_init_scan_worker,
+        initargs=(threads_per_worker, backend, max_tokens, window_overlap),
+    ) as pool:
+        futures = [pool.submit(_scan_shard, shard) for shard in shards]
+        results = []
+        for shard, future in zip(shards, futures):
+            if cancel is not None and cancel.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+            part = future.result()
+            results.extend(part)
+            if on_shard is not None:
+                on_shard(shard[0], part)
+    return results
+
+
+def flag_note(text_data, entities, threshold=PER_SCORE_THRESHOLD, has_email=None, has_phone=None):
+    """
+    Turns one note + its NER entities into a list of risk flags.
+    has_email / has_phone can be passed in when the prefilter already computed them.
+    """
+    # Check if any entities are 'PER' (Person) or look suspicious
+    # Note: We also manually check for '@' because NER sometimes misses emails,
+    # but is great at names. This is a "Hybrid" approach.
+    found_risks = []
+
+    # Check 1: AI Detected Names
+    for ent in entities:
+        # We filter for high confidence (>85%) to avoid false alarms
+        if ent.get("entity_group") == "PER" and float(ent.get("score", 0)) > threshold:
+            found_risks.append(f"NAME_DETECTED: {ent.get('word')}")
+
+    # Check 2: Pattern rules for emails / phone numbers (Hybrid Approach)
+    if has_email is None:
+        has_email = EMAIL_RE.search(text_data) is not None
+    if has_phone is None:
+        has_phone = PHONE_RE.search(text_data) is not None
+
+    if has_email:
+        found_risks.append("POSSIBLE_EMAIL")
+    if has_phone:
+        found_risks.append("POSSIBLE_PHONE")
+
+    return found_risks
+
+
+def prefilter_notes(notes: pd.Series) -> pd.DataFrame:
     """
-    Iterates through the DataFrame and uses AI to spot PII in the text.
+    Stage 1 of the scan cascade: one vectorized regex pass over the Notes column.
+
+    Returns a frame aligned to `notes` with boolean columns:
+    - is_text:       a real string (everything else is skipped)
+    - has_email:     EMAIL_RE matched
+    - has_phone:     PHONE_RE matched
+    - name_candidate: NAME_HINT_RE matched -> worth sending to the transformer
     """
-    # Load the brain once
-    nlp = load_auditor_brain()
-    
-    risky_rows = []
+    if isinstance(notes.dtype, pd.StringDtype):
+        is_text = notes.notna()  # typed by the invoice schema: every non-missing cell is text
+    else:
+        is_text = notes.map(lambda v: isinstance(v, str)).astype(bool)
+    text = notes.where(is_text, "").astype(str)
 
+    return pd.DataFrame(
+        {
+            "is_text": is_text,
+            "has_email": text.str.contains(EMAIL_RE, regex=True) & is_text,
+            "has_phone": text.str.contains(PHONE_RE, regex=True) & is_text,
+            "name_candidate": text.str.contains(NAME_HINT_RE, regex=True) & is_text,
+        },
+        index=notes.index,
+    )
+
+
+def scan_notes_for_risk(
+    df,
+    column_name="Notes",
+    nlp=None,
+    batch_size=1,
+    cache=None,
+    brain_loader=None,
+    prefilter=False,
+    workers=1,
+    threads_per_worker=None,
+    mp_context="spawn",
+    backend=DEFAULT_BACKEND,
+    progress=None,
+    cancel=None,
+    max_tokens=DEFAULT_MAX_TOKENS,
+    window_overlap=DEFAULT_WINDOW_OVERLAP,
+    service=None,
+):
+    """
+    Uses AI to spot PII in the text column of the DataFrame.
+
+    - nlp: an already-loaded pipeline. When omitted the brain is loaded here via
+      brain_loader (default: load_auditor_brain), and only if something misses the cache.
+    - batch_size: how many notes go through the model per call
+      (1 = legacy per-row calls).
+    - cache: optional NerCache; identical notes are only scanned once per run,
+      and notes seen in earlier runs skip the model entirely.
+    - prefilter: only notes that might contain a person's name (see NAME_HINT_RE)
+      go to the transformer; emails/phones are caught by regex either way.
+    - workers > 1: the notes that still need the model are sharded across a
+      process pool (one model per worker, threads_per_worker torch threads each).
+    - backend: which inference backend load_auditor_brain builds (pytorch / int8 / onnx).
+    - progress: optional callable(done, total, partial_findings), called as model
+      batches finish (at most every PROGRESS_INTERVAL_S); partial_findings covers
+      every row whose note has been answered so far.
+    - cancel: optional threading.Event; once set, the scan stops after the current
+      batch and returns the findings so far (scan_stats["cancelled"] = True).
+    - max_tokens / window_overlap: notes longer than max_tokens are read as
+      overlapping windows and their entities merged; all windows are batched
+      in length order to keep padding low (see src/ner_batching.py).
+    - service: URL (or ScanClient) of a warm scan service (src/scan_service.py).
+      When it is running with the same backend, cache misses are sent there and
+      no model is loaded here; otherwise (or if it fails mid-scan) the rest is
+      scanned in-process as usual.
+
+    Per-stage row counts are printed and kept in findings.attrs["scan_stats"].
+    """
     print(f"🕵️  Scanning {len(df)} rows for FOIP violations...")
-    
-    for index, row in df.iterrows():
-        text_data = row[column_name]
-        
-        # Skip empty rows or non-text garbage
-        if pd.isna(text_data) or not isinstance(text_data, str):
-            continue
+
+    # Stage 1: regex pass over the whole column (skips empty rows / non-text garbage)
+    notes = df[column_name] if column_name in df.columns else pd.Series(index=df.index, dtype=object)
+    with span("ner_prefilter", rows=len(notes)):
+        stage1 = prefilter_notes(notes)
+    valid = stage1["is_text"]
+    to_model = stage1["name_candidate"] if prefilter else valid
+
+    texts = notes[valid].tolist()
+    has_email = stage1.loc[valid, "has_email"].tolist()
+    has_phone = stage1.loc[valid, "has_phone"].tolist()
+    if "InvoiceID" in df.columns:
+        invoice_ids = df.loc[valid, "InvoiceID"].tolist()
+    else:
+        invoice_ids = ["Unknown"] * len(texts)
+
+    # Dedupe: each distinct note text only needs one answer
+    unique_texts = list(dict.fromkeys(notes[to_model].tolist()))
+    entities_by_text = cache.get_many(unique_texts) if cache is not None else {}
+    pending = [t for t in unique_texts if t not in entities_by_text]
+
+    if cache is not None:
+        print(f"   Cache: {len(entities_by_text)} hits, {len(pending)} misses "
+              f"({len(unique_texts)} distinct notes)")
+
+    pending_set = set(pending)
+    fresh = {}
+
+    def build_findings(only_answered=False):
+        risky_rows = []
+        for invoice_id, text_data, email, phone in zip(invoice_ids, texts, has_email, has_phone):
+            if only_answered and text_data in pending_set and text_data not in fresh:
+                continue
+            found_risks = flag_note(
+                text_data, fresh.get(text_data, entities_by_text.get(text_data, [])),
+                has_email=email, has_phone=phone,
+            )
+
+            # If we found anything, record the row
+            if found_risks:
+                risky_rows.append({
+                    "InvoiceID": invoice_id,
+                    "RiskContent": text_data,
+                    "DetectedFlags": ", ".join(found_risks)
+                })
+        return pd.DataFrame(risky_rows, columns=["InvoiceID", "RiskContent", "DetectedFlags"])
+
+    last_report = [0.0]
+
+    def record(done_texts, done_entities):
+        fresh.update(zip(done_texts, done_entities))
+        now = time.perf_counter()
+        if progress is not None and now - last_report[0] >= PROGRESS_INTERVAL_S:
+            last_report[0] = now
+            progress(len(fresh), len(pending), build_findings(only_answered=True))
+
+    if progress is not None:
+        progress(0, len(pending), build_findings(only_answered=True))
+
+    batching = {}
+    todo = pending
+    client = connect_service(
+        service, model=model_tag(backend), max_tokens=max_tokens, window_overlap=window_overlap
+    ) if pending else None
+    if client is not None:
+        print(f"   Using warm scan service at {client.url}")
+        with span("ner_service", rows=len(pending), url=client.url):
+            for start in range(0, len(pending), CLIENT_CHUNK):
+                if cancel is not None and cancel.is_set():
+                    break
+                chunk = pending[start:start + CLIENT_CHUNK]
+                try:
+                    record(chunk, client.scan(chunk))
+                except ServiceUnavailable as e:
+                    print(f"   ⚠️  Scan service failed ({e}); scanning the rest in-process.")
+                    break
+        batching["service_notes"] = len(fresh)
+        cancelled_early = cancel is not None and cancel.is_set()
+        todo = [] if cancelled_early else [t for t in pending if t not in fresh]
+
+    if todo and workers > 1 and len(todo) > (batch_size or 1):
+        print(f"   Sharding {len(todo)} notes across {workers} worker processes...")
+        # Model load happens inside each worker, so it is part of this span.
+        # Shards of similar-length notes (by characters) keep each worker's batches tight.
+        with span("ner_inference", rows=len(todo), workers=workers, batch_size=batch_size):
+            run_ner_parallel(
+                sorted(todo, key=len), workers, batch_size=batch_size,
+                threads_per_worker=threads_per_worker, mp_context=mp_context, backend=backend,
+                on_shard=record, cancel=cancel, max_tokens=max_tokens, window_overlap=window_overlap,
+            )
+    elif todo:
+        # Load the brain once (only when the cache could not answer everything)
+        if nlp is None:
+            with span("model_load", backend=backend):
+                nlp = brain_loader() if brain_loader else load_brain_for_backend(backend)
+
+        # Token counts + windows per note (only cache misses get here)
+        with span("ner_tokenize", rows=len(todo)) as s:
+            layouts = TokenLayouts(nlp, max_tokens=max_tokens, overlap=window_overlap)
+            layouts.get(todo)
+            s.attrs["tokenized"] = batching["tokenized"] = layouts.tokenized
 
         # RUN THE AI PREDICTION
-        # The model reads the sentence and returns a list of "Entities" it found.
-        entities = nlp(text_data)
-        
-        # Check if any entities are 'PER' (Person) or look suspicious
-        # Note: We also manually check for '@' because NER sometimes misses emails, 
-        # but is great at names. This is a "Hybrid" approach.
-        found_risks = []
-        
-        # Check 1: AI Detected Names
-        for ent in entities:
-            # We filter for high confidence (>85%) to avoid false alarms
-            if ent['entity_group'] == 'PER' and ent['score'] > 0.85:
-                found_risks.append(f"NAME_DETECTED: {ent['word']}")
-        
-        # Check 2: Simple Rule for Emails (Hybrid Approach)
-        if "@" in text_data and "." in text_data:
-             found_risks.append("POSSIBLE_EMAIL")
-
-        # If we found anything, record the row
-        if found_risks:
-            risky_rows.append({
-                "InvoiceID": row.get("InvoiceID", "Unknown"),
-                "RiskContent": text_data,
-                "DetectedFlags": ", ".join(found_risks)
-            })
-
-    return pd.DataFrame(risky_rows)
+        # The model reads each sentence and returns a list of "Entities" it found.
+        # Windows go through in length-sorted batches; notes are recorded as they complete.
+        with span("ner_inference", rows=len(todo), workers=1, batch_size=batch_size):
+            for positions, entities in iter_ner_bucketed(nlp, todo, batch_size, layouts, stats=batching):
+                record([todo[p] for p in positions], entities)
+                if cancel is not None and cancel.is_set():
+                    break
+
+    cancelled = len(fresh) < len(pending)
+    if fresh and cache is not None:
+        cache.put_many(fresh)
+
+    stats = {
+        "rows": int(len(df)),
+        "dropped_not_text": int((~valid).sum()),
+        "dropped_by_prefilter": int((valid & ~to_model).sum()),
+        "rows_to_model": int(to_model.sum()),
+        "distinct_notes_to_model": len(unique_texts),
+        "model_inferences": len(fresh),
+        "regex_email_rows": int(stage1["has_email"].sum()),
+        "regex_phone_rows": int(stage1["has_phone"].sum()),
+        "cancelled": cancelled,
+        **batching,
+    }
+    print(f"   Stages: {stats['rows']} rows -> {stats['rows'] - stats['dropped_not_text']} text "
+          f"-> {stats['rows_to_model']} name candidates -> {stats['model_inferences']} model inferences")
+    if cancelled:
+        print(f"   ⏹️  Cancelled after {len(fresh)} of {len(pending)} notes; returning findings so far.")
+
+    findings = build_findings(only_answered=cancelled)
+    findings.attrs["scan_stats"] = stats
+    if progress is not None:
+        progress(len(fresh), len(pending), findings)
+    return findings
 
 # 3. EXECUTION
+def batch_size_from_config(config):
+    """Reads ai_settings.batch_size from the audit config (defaults to DEFAULT_BATCH_SIZE)."""
+    ai = config.get("ai_settings", {}) or {}
+    return int(ai.get("batch_size", DEFAULT_BATCH_SIZE))
+
+
+def prefilter_from_config(config):
+    """Reads ai_settings.prefilter (regex/gazetteer stage before the model)."""
+    ai = config.get("ai_settings", {}) or {}
+    return bool(ai.get("prefilter", False))
+
+
+def scan_options_from_config(config):
+    """
+    Everything scan_notes_for_risk needs from ai_settings, as keyword arguments
+    (the cache is opened separately because it owns a file handle).
+    """
+    ai = config.get("ai_settings", {}) or {}
+    threads = ai.get("threads_per_worker")
+    return {
+        "batch_size": batch_size_from_config(config),
+        "prefilter": prefilter_from_config(config),
+        "workers": int(ai.get("workers", 1) or 1),
+        "threads_per_worker": int(threads) if threads else None,
+        "backend": ai.get("backend", DEFAULT_BACKEND) or DEFAULT_BACKEND,
+        "max_tokens": int(ai.get("max_tokens", DEFAULT_MAX_TOKENS) or DEFAULT_MAX_TOKENS),
+        "window_overlap": int(ai.get("window_overlap", DEFAULT_WINDOW_OVERLAP)),
+        "service": service_settings(config)["url"],
+    }
+
+
+def cache_from_config(config):
+    """
+    Opens the NER result cache described by ai_settings.cache_path.
+    Returns None when caching is switched off (cache_path: null / empty).
+    """
+    ai = config.get("ai_settings", {}) or {}
+    path = ai.get("cache_path", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    return NerCache(
+        path,
+        model_id=model_tag(ai.get("backend", DEFAULT_BACKEND)),
+        threshold=PER_SCORE_THRESHOLD,
+        max_entries=int(ai.get("cache_max_entries", DEFAULT_MAX_ENTRIES)),
+    )
+
+
+def run_ai_audit(df, options, cache=None, out_path=AI_FINDINGS_PATH, evidence=None):
+    """
+    The CLI scan on an already-loaded frame: scan, print the findings and save
+    them to out_path (also used by the single-process pipeline, src/orchestrator.py).
+    The findings are also written next to it as a timestamped evidence pack
+    (foip_ai_findings_<ts>.*, the files the findings catalog ingests);
+    evidence: evidence_settings(config) (formats, workers).
+    """
+    # Run the Scan
+    risk_report = scan_notes_for_risk(df, cache=cache, **options)
+
+    if not risk_report.empty:
+        print(f"\n🚨 AI AUDIT COMPLETE: Found {len(risk_report)} Privacy Violations!")
+        print(risk_report.to_string(index=False))
+
+        # Save the report
+        with span("export", rows=len(risk_report)):
+            risk_report.to_csv(out_path, index=False)
+            pack = write_evidence_pack(
+                {"foip_ai_findings": risk_report}, os.path.dirname(out_path) or ".", **(evidence or {})
+            )
+        print("\n📄 Evidence exports saved:")
+        for path in [out_path, *pack["files"].values()]:
+            print(f"   - {path}")
+    else:
+        print("✅ AI Scan Complete. No privacy risks found.")
+    return risk_report
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FOIP/PII scan of the invoice Notes column.")
+    parser.add_argument("--config", default="config/audit_rules.yaml")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Notes per model call (overrides ai_settings.batch_size; 1 = per-row).")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the on-disk NER result cache.")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="Send every non-empty note to the model (skip the regex/gazetteer stage).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for the NER stage (overrides ai_settings.workers).")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="NER inference backend (overrides ai_settings.backend).")
+    parser.add_argument("--no-service", action="store_true",
+                        help="Always load the model in-process (ignore ai_settings.service_url).")
+    parser.add_argument("--profile", nargs="*", default=[], metavar="STAGE[:MODE]",
+                        help="Profile stages in the run record, e.g. ner_inference model_load:tracemalloc.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.backend is not None:
+        config.setdefault("ai_settings", {})["backend"] = args.backend
+    options = scan_options_from_config(config)
+    if args.batch_size is not None:
+        options["batch_size"] = args.batch_size
+    if args.no_prefilter:
+        options["prefilter"] = False
+    if args.workers is not None:
+        options["workers"] = args.workers
+    if args.no_service:
+        options["service"] = None
+
     # Load the messy data we made in Day 1
     input_path = "data/raw_erp_dump/invoices.xlsx"
-    
+    recorder = recorder_from_config("ai_auditor", config, profile=parse_profile_args(args.profile))
+
     if os.path.exists(input_path):
-        df = pd.read_excel(input_path)
-        
-        # Run the Scan
-        risk_report = scan_notes_for_risk(df)
-        
-        if not risk_report.empty:
-            print(f"\n🚨 AI AUDIT COMPLETE: Found {len(risk_report)} Privacy Violations!")
-            print(risk_report.to_string(index=False))
-            
-            # Save the report
-            risk_report.to_csv("data/audit_reports/ai_risk_findings.csv", index=False)
-        else:
-            print("✅ AI Scan Complete. No privacy risks found.")
+        with recorder.activate() if recorder else nullcontext():
+            with span("ingest") as s:
+                df = load_table(input_path, cache_dir=ingest_cache_dir(config), schema=INVOICE_SCHEMA)
+                s.rows = len(df)
+
+            cache = None if args.no_cache else cache_from_config(config)
+            risk_report = run_ai_audit(df, options, cache=cache, evidence=evidence_settings(config))
+
+            with span("catalog"):
+                catalog = update_catalog(os.path.dirname(AI_FINDINGS_PATH), config)
+            if catalog is not None:
+                print(f"\n🗂️  Findings catalog: +{catalog} findings")
+
+        if recorder is not None:
+            recorder.meta.update({"scan_options": options, "scan_stats": risk_report.attrs.get("scan_stats")})
+            print(f"\n🧾 Run record: {recorder.save()}")
     else:
-        print("❌ Error: Data file not found. Run src/data_generator.py first.")
\ No newline at end of file
+        print("❌ Error: Data file not found. Run src/data_generator.py first.")
@@ -0,0 +1,334 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Allow `python src/batch_audit.py` as well as `from src import batch_audit`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.evidence import evidence_settings, write_evidence_pack
+from src.findings_catalog import update_catalog
+from src.schema import INVOICE_SCHEMA
+from src.ingest import load_table, ingest_cache_dir
+from src.rule_engine import (
+    DEFAULT_CONFIG_PATH, DEFAULT_MASTER_PATH, REPORT_DIR,
+    audit_invoices, export_findings, load_config, vendor_index_path,
+)
+from src.telemetry import peak_rss_mb, span, recorder_from_config
+from src.vendor_index import VendorIndex
+
+# ----------------------------
+# Multi-source batch audit
+# ----------------------------
+# One invoice export per department and month means dozens of files per
+# cycle. Instead of one interpreter per file, the batch audit loads the config
+# and the vendor index once and fans the sources out over a process pool:
+#
+#   sources (dir / glob / files) -> pool workers (config + VendorIndex loaded
+#   once per worker, in the initializer) -> one rule run + evidence pack per source
+#
+# Outputs (report_dir = data/audit_reports):
+#   batch_<ts>/<source>/...          per-source evidence pack + manifest
+#   ghost_vendors_<ts>.csv, ...      consolidated findings of every source, with a
+#                                    Source column (the findings catalog ingests these)
+#   batch_sources_<ts>.csv           per-source rows, finding counts, time, status
+#
+# Bounded resources: at most `workers` processes, and sources are only started
+# while their estimated in-memory size (file size x a per-format factor) plus
+# a per-worker baseline fits memory_budget_mb. One source always runs, even if
+# it alone is over budget. Largest sources start first.
+
+SOURCE_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv", ".parquet")
+DEFAULT_WORKERS = 4
+DEFAULT_MEMORY_BUDGET_MB = 4096
+WORKER_BASE_MB = 200   # interpreter + pandas + vendor index per worker
+# Rough in-memory DataFrame size per byte on disk (xlsx is zipped XML parsed by openpyxl)
+MEMORY_FACTOR = {".xlsx": 15, ".xlsm": 15, ".xls": 15, ".csv": 4, ".parquet": 8}
+FINDING_TABLES = ("ghost_vendors", "po_variance", "high_value", "duplicate_invoices")
+
+
+def batch_settings(config: dict) -> dict:
+    """batch_settings.workers / memory_budget_mb from the audit config."""
+    settings = config.get("batch_settings", {}) or {}
+    return {
+        "workers": int(settings.get("workers") or DEFAULT_WORKERS),
+        "memory_budget_mb": float(settings.get("memory_budget_mb") or DEFAULT_MEMORY_BUDGET_MB),
+    }
+
+
+def expand_sources(patterns) -> list:
+    """
+    Invoice files named by `patterns`: directories (searched recursively for
+    SOURCE_SUFFIXES), globs ("data/exports/**/*.xlsx") or plain paths. Sorted, deduplicated.
+    """
+    if isinstance(patterns, (str, os.PathLike)):
+        patterns = [patterns]
+    found = []
+    for pattern in map(str, patterns):
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        found.extend(m for m in matches if os.path.isfile(m) and m.lower().endswith(SOURCE_SUFFIXES))
+    return sorted(dict.fromkeys(os.path.normpath(m) for m in found))
+
+
+def source_keys(sources) -> dict:
+    """Short unique name per source: its path below the sources' common directory, '/' -> '__'."""
+    if not sources:
+        return {}
+    dirs = [os.path.dirname(os.path.abspath(s)) for s in sources]
+    common = os.path.commonpath(dirs)
+    return {s: os.path.relpath(os.path.abspath(s), common).replace(os.sep, "__") for s in sources}
+
+
+def estimate_mb(path) -> float:
+    """Estimated peak size of one source as a DataFrame (see MEMORY_FACTOR)."""
+    suffix = os.path.splitext(path)[1].lower()
+    return os.path.getsize(path) * MEMORY_FACTOR.get(suffix, 4) / (1024 * 1024)
+
+
+# Each pool worker keeps the shared config and vendor index here, set once in the
+# initializer (only ever in worker processes; the parent passes them as arguments).
+_WORKER_CONFIG = None
+_WORKER_VENDORS = None
+
+
+def _init_batch_worker(config, vendors):
+    global _WORKER_CONFIG, _WORKER_VENDORS
+    _WORKER_CONFIG = config
+    _WORKER_VENDORS = vendors
+
+
+def _audit_source_in_worker(task):
+    return _audit_source(task, _WORKER_CONFIG, _WORKER_VENDORS)
+
+
+def _new_outcome(task) -> dict:
+    source, key, _ = task
+    return {"source": source, "key": key, "rows": 0, "counts": {}, "paths": {}, "findings": {}, "error": None}
+
+
+def _audit_source(task, config, vendors):
+    """Audits one source and writes its evidence pack. Errors are returned, not raised."""
+    source, key, out_dir = task
+    started = time.perf_counter()
+    outcome = _new_outcome(task)
+    try:
+        invoices = load_table(source, cache_dir=ingest_cache_dir(config), schema=INVOICE_SCHEMA)
+        results = audit_invoices(invoices, vendors, config)
+        high_value = results["high_value"] if "high_value" in results["rules"] else None
+        duplicates = results["duplicates"] if "duplicates" in results["rules"] else None
+        paths = export_findings(
+            results["ghosts"], results["failures"], out_dir=out_dir, duplicates=duplicates, high_value=high_value,
+            **evidence_settings(config),
+        )
+        findings = {"ghost_vendors": results["ghosts"], "po_variance": results["failures"]}
+        if high_value is not None:
+            findings["high_value"] = high_value
+        if duplicates is not None:
+            findings["duplicate_invoices"] = duplicates
+        outcome.update(
+            rows=len(invoices),
+            counts={name: len(df) for name, df in findings.items()},
+            paths=paths,
+            findings=findings,
+        )
+    except Exception as e:  # one unreadable export must not sink the whole cycle
+        outcome["error"] = f"{type(e).__name__}: {e}"
+    outcome["seconds"] = round(time.perf_counter() - started, 3)
+    outcome["peak_rss_mb"] = peak_rss_mb()
+    return outcome
+
+
+def _run_bounded(tasks, estimates, workers, budget_mb, on_done, config, vendors, mp_context=None):
+    """
+    Runs tasks on at most `workers` processes, starting the next one only while the
+    estimated memory of the running ones fits budget_mb (each costs the worker
+    baseline plus its source estimate). config / vendors reach each worker once,
+    through the pool initializer. on_done(outcome) is called in completion order.
+
+    A worker that dies (e.g. killed by the OOM killer) breaks the pool: the sources
+    it was running alongside get a failed outcome and the rest of the queue goes on
+    in a fresh pool.
+    """
+    ctx = multiprocessing.get_context(mp_context) if mp_context else None
+    queue = [(task, WORKER_BASE_MB + mb) for task, mb in zip(tasks, estimates)]
+    while queue:
+        running = {}
+        broken = False
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx,
+            initializer=_init_batch_worker, initargs=(config, vendors),
+        ) as pool:
+            while (queue and not broken) or running:
+                in_use = sum(mb for _, mb, _ in running.values())
+                while (not broken and queue and len(running) < workers
+                       and (not running or in_use + queue[0][1] <= budget_mb)):
+                    task, mb = queue.pop(0)
+                    running[pool.submit(_audit_source_in_worker, task)] = (task, mb, time.perf_counter())
+                    in_use += mb
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, _, started = running.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:  # the worker process itself died; keep every other outcome
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        outcome = _new_outcome(task)
+                        outcome.update(
+                            error=f"{type(e).__name__}: worker process failed: {e}",
+                            seconds=round(time.perf_counter() - started, 3),
+                            peak_rss_mb=None,
+                        )
+                    on_done(outcome)
+
+
+def _consolidate(outcomes) -> dict:
+    """Per-check findings of every source in one table each, Source column first."""
+    tables = {}
+    for name in FINDING_TABLES:
+        parts = [o["findings"][name].assign(Source=o["key"]) for o in outcomes if name in o["findings"]]
+        if not parts:
+            continue
+        # Empty frames only contribute their columns (pandas warns on concatenating them)
+        df = pd.concat([p for p in parts if len(p)] or parts[:1], ignore_index=True)
+        # Sources disagree on types (dates parsed from xlsx, text from csv): keep such columns as text
+        for col in df.columns[df.dtypes == object]:
+            values = df[col].dropna()
+            if values.map(type).nunique() > 1:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        tables[name] = df[["Source"] + [c for c in df.columns if c != "Source"]]
+    return tables
+
+
+def run_batch_audit(
+    sources,
+    master_path=DEFAULT_MASTER_PATH,
+    config_path=DEFAULT_CONFIG_PATH,
+    report_dir=REPORT_DIR,
+    workers=None,
+    memory_budget_mb=None,
+    mp_context=None,
+):
+    """
+    Audits every invoice file in `sources` (see expand_sources) against one vendor
+    master. workers / memory_budget_mb default to batch_settings in the config;
+    workers <= 1 audits the sources one by one in this process.
+
+    Returns {"sources": [per-source outcome without the finding frames],
+    "consolidated": {table: DataFrame}, "paths": {(table, fmt): path}, "manifest"}.
+    """
+    config = load_config(config_path)
+    settings = batch_settings(config)
+    workers = int(workers or settings["workers"])
+    budget_mb = float(memory_budget_mb or settings["memory_budget_mb"])
+    files = expand_sources(sources)
+    if not files:
+        print(f"❌ Error: No invoice files ({', '.join(SOURCE_SUFFIXES)}) found in {sources}")
+        return None
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    batch_dir = os.path.join(report_dir, f"batch_{ts}")
+    keys = source_keys(files)
+    # Largest first, so one big export does not start last and run alone
+    files.sort(key=lambda f: os.path.getsize(f), reverse=True)
+    estimates = [estimate_mb(f) for f in files]
+    tasks = [(f, keys[f], os.path.join(batch_dir, keys[f])) for f in files]
+    workers = max(1, min(workers, len(files), int(budget_mb // WORKER_BASE_MB)))
+
+    recorder = recorder_from_config("batch_audit", config)
+    outcomes = []
+
+    def on_done(outcome):
+        outcomes.append(outcome)
+        status = f"❌ {outcome['error']}" if outcome["error"] else (
+            f"{outcome['rows']} rows, " + ", ".join(f"{n} {t}" for t, n in outcome["counts"].items()))
+        print(f"   [{len(outcomes)}/{len(files)}] {outcome['key']}: {status} ({outcome['seconds']:.1f}s)")
+
+    with recorder.activate() if recorder else nullcontext():
+        # Loaded once here; each worker receives it once through the pool initializer
+        with span("vendor_index"):
+            vendors = VendorIndex.load_or_build(master_path, vendor_index_path(config))
+
+        print(f"📚 Batch audit: {len(files)} source(s), {workers} worker(s), "
+              f"memory budget {budget_mb:.0f} MB (estimated {sum(estimates):.0f} MB of data)")
+        over = [keys[f] for f, mb in zip(files, estimates) if WORKER_BASE_MB + mb > budget_mb]
+        if over:
+            print(f"⚠️  Over the memory budget on their own (run alone): {', '.join(over)}")
+
+        with span("batch_audit", workers=workers) as s:
+            if workers <= 1:
+                for task in tasks:
+                    on_done(_audit_source(task, config, vendors))
+            else:
+                _run_bounded(tasks, estimates, workers, budget_mb, on_done, config, vendors, mp_context=mp_context)
+            s.rows = sum(o["rows"] for o in outcomes)
+
+        # Consolidated evidence, sources in name order (not completion order)
+        outcomes.sort(key=lambda o: o["key"])
+        consolidated = _consolidate(outcomes)
+        summary = pd.DataFrame(
+            [
+                {"Source": o["key"], "Path": o["source"], "Rows": o["rows"],
+                 **{t: o["counts"].get(t, 0) for t in FINDING_TABLES},
+                 "Seconds": o["seconds"], "PeakRssMB": o["peak_rss_mb"], "Error": o["error"] or ""}
+                for o in outcomes
+            ]
+        )
+        with span("export", rows=sum(len(df) for df in consolidated.values())):
+            pack = write_evidence_pack(
+                {**consolidated, "batch_sources": summary}, report_dir, timestamp=ts, **evidence_settings(config)
+            )
+
+        with span("catalog"):
+            catalog = update_catalog(report_dir, config)
+        if catalog is not None:
+            print(f"🗂️  Findings catalog: +{catalog} findings")
+
+    failed = [o for o in outcomes if o["error"]]
+    print(f"\n✅ Batch audit complete: {len(outcomes) - len(failed)} of {len(outcomes)} source(s), "
+          f"{sum(o['rows'] for o in outcomes)} rows")
+    for name, df in consolidated.items():
+        print(f"   {name}: {len(df)} findings across {df['Source'].nunique()} source(s)")
+    print("\n📄 Consolidated evidence:")
+    for path in pack["files"].values():
+        print(f"   - {path}")
+    print(f"   - per-source packs under {batch_dir}")
+
+    if recorder is not None:
+        recorder.meta.update({"sources": len(files), "failed": len(failed), "workers": workers,
+                              "memory_budget_mb": budget_mb})
+        print(f"\n🧾 Run record: {recorder.save()}")
+
+    for o in outcomes:
+        o.pop("findings")
+    return {"sources": outcomes, "consolidated": consolidated, "paths": pack["files"], "manifest": pack["manifest"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit many invoice exports (dir / glob / files) in one run.")
+    parser.add_argument("sources", nargs="+", help="Directories, globs or files, e.g. 'data/exports/2026-09/*.xlsx'")
+    parser.add_argument("--master", default=DEFAULT_MASTER_PATH)
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--report-dir", default=REPORT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (overrides batch_settings.workers).")
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="Memory budget for sources in flight (overrides batch_settings.memory_budget_mb).")
+    args = parser.parse_args()
+
+    run_batch_audit(
+        args.sources, master_path=args.master, config_path=args.config, report_dir=args.report_dir,
+        workers=args.workers, memory_budget_mb=args.memory_budget_mb,
+    )
@@ -1,7 +1,12 @@
-import pandas as pd
+import argparse
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
 from faker import Faker
-import os
 
 # 1. SETUP
 # Initialize Faker with Canadian localization
@@ -15,6 +20,8 @@ random.seed(101)
 # DEFINING THE "TRUTH"
 # These are the only vendors that legally exist in our system.
 VALID_VENDORS = [f"VENDOR-{i:03d}" for i in range(1, 21)]
+RAW_DIR = "data/raw_erp_dump"
+DEMO_RECORDS = 50
 
 def get_risky_note():
     """
@@ -76,28 +83,200 @@ def generate_erp_data(num_records=100):
         
     return pd.DataFrame(data)
 
-# 4. EXECUTION
-if __name__ == "__main__":
-    print("🚀 Starting 'Dirty' Data Generation Pipeline...")
-    
-    # Create the directory structure if it doesn't exist
-    os.makedirs("data/raw_erp_dump", exist_ok=True)
-    
-    # STEP 1: Save the "Truth" (Master List)
-    # An auditor needs a reference list to check against.
+# 3. BULK MODE (load testing)
+# generate_erp_data() calls Faker several times per row, which is fine for a
+# demo dump but far too slow for millions of rows. Bulk mode draws every
+# numeric column and every "dice roll" (ghost vendor, PO mismatch, dirty
+# note) with NumPy in one go, and picks Faker strings from pools generated
+# once up front. Rows are produced in shards; each shard has its own seed
+# (spawned from the run seed), so the output is identical no matter how many
+# worker processes share the work. Every shard is written straight to its
+# own CSV/Parquet part file, so the full dataset is never held in memory.
+
+POOL_SIZE = 5_000
+CLEAN_NOTES = ["Delivered on time", "Net 30 Terms", "Annual maintenance", "Software subscription"]
+BULK_FORMATS = ("csv", "parquet")
+
+
+def build_string_pools(seed=101, size=POOL_SIZE):
+    """Faker-derived strings, generated once and reused by every shard."""
+    pool_fake = Faker('en_CA')
+    pool_fake.seed_instance(seed)
+    return {
+        "company": np.array([pool_fake.company() for _ in range(size)], dtype=object),
+        "email": np.array([pool_fake.free_email() for _ in range(size)], dtype=object),
+        "name": np.array([pool_fake.name() for _ in range(size)], dtype=object),
+        "phone": np.array([pool_fake.phone_number() for _ in range(size)], dtype=object),
+    }
+
+
+def shard_seeds(seed, num_shards):
+    """Independent, reproducible seeds for each shard (same run seed -> same shard seeds)."""
+    return [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(num_shards)]
+
+
+def _bulk_notes(rng, n, pools):
+    """Same mix as get_risky_note(): 85% clean, 15% PII leaks (email / name / phone)."""
+    notes = np.array(CLEAN_NOTES, dtype=object)[rng.integers(0, len(CLEAN_NOTES), n)]
+    dirty = np.flatnonzero(rng.random(n) < 0.15)
+    kind = rng.integers(0, 3, len(dirty))
+
+    templates = (
+        ("Please forward the private contract to {}", pools["email"]),
+        ("CONFIDENTIAL: Discuss with {} before processing.", pools["name"]),
+        ("Urgent: Call personal cell {}", pools["phone"]),
+    )
+    for k, (template, pool) in enumerate(templates):
+        rows = dirty[kind == k]
+        prefix, suffix = template.split("{}")
+        values = pd.Series(pool[rng.integers(0, len(pool), len(rows))], dtype=object)
+        notes[rows] = (prefix + values + suffix).to_numpy()
+    return notes
+
+
+def generate_erp_data_bulk(num_records, seed=101, pools=None, today=None):
+    """
+    Vectorized generate_erp_data(): same columns and the same ghost / PO / PII rates,
+    drawn in bulk. Deterministic for a given (num_records, seed, pools, today).
+    """
+    rng = np.random.default_rng(seed)
+    pools = pools if pools is not None else build_string_pools()
+    today = today or date.today()
+    n = int(num_records)
+
+    # 1. GHOST VENDOR LOGIC (5%)
+    ghost = rng.random(n) < 0.05
+    vendor_id = np.array(VALID_VENDORS, dtype=object)[rng.integers(0, len(VALID_VENDORS), n)]
+    vendor_id[ghost] = "VENDOR-999"
+    vendor_name = pools["company"][rng.integers(0, len(pools["company"]), n)]
+    vendor_name[ghost] = "Unknown Shell Co"
+
+    # 2. FINANCIAL LOGIC
+    invoice_amount = np.round(rng.uniform(1000, 50000, n), 2)
+
+    # 3. PO MISMATCH LOGIC (10% undersized POs)
+    po_amount = np.where(rng.random(n) < 0.10, np.round(invoice_amount * 0.8, 2), invoice_amount)
+
+    # 4. IDS + DATES ('INV-####-??', last ~6 months)
+    digits = pd.Series(rng.integers(0, 10_000, n)).astype(str).str.zfill(4)
+    letters = rng.integers(ord("a"), ord("z") + 1, (n, 2)).astype(np.uint8).view("S1").astype(str)
+    letters = pd.Series(np.char.add(letters[:, 0], letters[:, 1]))
+    start = np.datetime64(today - timedelta(days=182))
+    invoice_date = start + rng.integers(0, 183, n).astype("timedelta64[D]")
+
+    return pd.DataFrame(
+        {
+            "InvoiceID": ("INV-" + digits + "-" + letters).to_numpy(),
+            "VendorID": vendor_id,
+            "VendorName": vendor_name,
+            "InvoiceDate": pd.to_datetime(invoice_date).date,
+            "InvoiceAmount": invoice_amount,
+            "PO_Amount": po_amount,
+            "Department": "IT - Tech & Innovation",
+            "Notes": _bulk_notes(rng, n, pools),
+        }
+    )
+
+
+_SHARD_POOLS = None
+
+
+def _init_bulk_worker(pools):
+    global _SHARD_POOLS
+    _SHARD_POOLS = pools
+
+
+def _write_shard(task):
+    """Generates one shard and writes it as its own part file. Returns (path, rows)."""
+    index, rows, seed, out_dir, fmt, today = task
+    df = generate_erp_data_bulk(rows, seed=seed, pools=_SHARD_POOLS, today=today)
+    path = os.path.join(out_dir, f"invoices_part-{index:05d}.{fmt}")
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path, len(df)
+
+
+def write_bulk_invoices(num_records, out_dir, fmt="csv", shard_rows=1_000_000, workers=1, seed=101, today=None):
+    """
+    Generates num_records invoices in shards of shard_rows and streams each shard to
+    out_dir/invoices_part-NNNNN.<fmt>. Returns the list of part files, in order.
+    """
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f"❌ Unknown format: {fmt}. Use one of {BULK_FORMATS}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    today = today or date.today()
+    num_shards = max(1, -(-int(num_records) // shard_rows))
+    sizes = [min(shard_rows, num_records - i * shard_rows) for i in range(num_shards)]
+    tasks = [
+        (i, rows, s, out_dir, fmt, today)
+        for i, (rows, s) in enumerate(zip(sizes, shard_seeds(seed, num_shards)))
+    ]
+    pools = build_string_pools(seed)
+
+    if workers <= 1 or num_shards == 1:
+        _init_bulk_worker(pools)
+        return [_write_shard(t)[0] for t in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, num_shards), initializer=_init_bulk_worker,
+                             initargs=(pools,)) as pool:
+        return [path for path, _ in pool.map(_write_shard, tasks)]
+
+
+# 5. EXECUTION
+def write_vendor_master(raw_dir=RAW_DIR):
+    """STEP 1: Save the "Truth" (Master List). An auditor needs a reference list to check against."""
+    os.makedirs(raw_dir, exist_ok=True)
     master_df = pd.DataFrame({"VendorID": VALID_VENDORS, "Status": "Active"})
-    master_path = "data/raw_erp_dump/vendor_master.csv"
+    master_path = os.path.join(raw_dir, "vendor_master.csv")
     master_df.to_csv(master_path, index=False)
     print(f"✅ Master Vendor List (The Truth) saved to {master_path}")
+    return master_path
+
+
+def write_demo_dump(raw_dir=RAW_DIR, num_records=DEMO_RECORDS):
+    """
+    The demo ERP dump: vendor_master.csv + invoices.xlsx under raw_dir.
+    Returns (invoice_path, master_path).
+    """
+    master_path = write_vendor_master(raw_dir)
 
     # STEP 2: Save the "Mess" (Invoices)
     # We generate 50 invoices. Statistically, ~2-3 will be Ghosts and ~7-8 will have PII leaks.
-    invoice_df = generate_erp_data(50)
-    invoice_path = "data/raw_erp_dump/invoices.xlsx"
+    invoice_df = generate_erp_data(num_records)
+    invoice_path = os.path.join(raw_dir, "invoices.xlsx")
     invoice_df.to_excel(invoice_path, index=False)
-    
+
     print(f"✅ Raw Invoice Dump (The Reality) saved to {invoice_path}")
-    
+
     # Peek at the data to show the user the "Dirty" rows
     print("\nSample Data (Look for PII in 'Notes'):")
-    print(invoice_df[['VendorID', 'InvoiceAmount', 'Notes']].head(5))
\ No newline at end of file
+    print(invoice_df[['VendorID', 'InvoiceAmount', 'Notes']].head(5))
+    return invoice_path, master_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic ERP dump.")
+    parser.add_argument("--bulk", type=int, default=None, metavar="ROWS",
+                        help="Load-testing mode: generate ROWS invoices as chunked part files.")
+    parser.add_argument("--format", choices=BULK_FORMATS, default="csv")
+    parser.add_argument("--out-dir", default="data/raw_erp_dump/bulk")
+    parser.add_argument("--shard-rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=101)
+    args = parser.parse_args()
+
+    print("🚀 Starting 'Dirty' Data Generation Pipeline...")
+
+    if args.bulk:
+        write_vendor_master()
+        # STEP 2 (bulk): Stream the "Mess" to chunked part files
+        parts = write_bulk_invoices(
+            args.bulk, args.out_dir, fmt=args.format, shard_rows=args.shard_rows,
+            workers=args.workers, seed=args.seed,
+        )
+        print(f"✅ Bulk Invoice Dump: {args.bulk:,} rows in {len(parts)} {args.format} part(s) under {args.out_dir}")
+    else:
+        write_demo_dump()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Duplicate invoice detection
+# ----------------------------
+# Comparing every invoice with every other one is O(n^2) and hopeless at
+# millions of rows. Instead:
+#
+# 1. Exact duplicates: same VendorID and same amount (to the cent). One hash
+#    group-by over (vendor, cents); every invoice after the earliest one in
+#    its group is a duplicate of that earliest one.
+# 2. Near duplicates: amounts within amount_tolerance (relative) and
+#    InvoiceDate at most date_window_days apart. Rows are sorted once by
+#    (vendor, amount, date) and swept with a growing offset k: row i is only
+#    compared with row i-k while some pair is still the same vendor and within
+#    the amount tolerance. Because amounts are sorted inside each vendor, the
+#    sweep stops after the widest cluster of similar amounts, so the cost is
+#    O(n log n) for the sort plus O(n * cluster width) vectorized compares.
+#
+# The later invoice of a pair is the flagged one (that is the payment to stop);
+# "original" points at the invoice it repeats.
+
+DEFAULT_AMOUNT_TOLERANCE = 0.005
+DEFAULT_DATE_WINDOW_DAYS = 7
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def duplicate_settings(config: dict) -> dict:
+    """duplicate_settings.amount_tolerance / date_window_days from the audit config."""
+    settings = config.get("duplicate_settings", {}) or {}
+    return {
+        "amount_tolerance": float(settings.get("amount_tolerance", DEFAULT_AMOUNT_TOLERANCE)),
+        "date_window_days": float(settings.get("date_window_days", DEFAULT_DATE_WINDOW_DAYS)),
+    }
+
+
+def find_duplicates(vendor_ids, amounts, dates, amount_tolerance=DEFAULT_AMOUNT_TOLERANCE,
+                    date_window_days=DEFAULT_DATE_WINDOW_DAYS) -> tuple:
+    """
+    Returns (original, kind), both aligned with the input rows:
+    - original[i]: position of the invoice row i duplicates, -1 if none
+    - kind[i]: "exact" | "near" | ""
+    Rows without a VendorID or amount are never matched; near matches also need a date.
+    """
+    vendor_codes, _ = pd.factorize(pd.Series(vendor_ids).astype(object), use_na_sentinel=True)
+    amount = np.asarray(amounts, dtype=float)
+    n = len(amount)
+    original = np.full(n, -1, dtype=np.int64)
+    kind = np.full(n, "", dtype=object)
+    if n == 0:
+        return original, kind
+
+    stamps = pd.to_datetime(pd.Series(dates), errors="coerce")
+    has_date = stamps.notna().to_numpy()
+    # Undated rows sort last, so the earliest dated invoice is the "original"
+    day = np.where(has_date, stamps.to_numpy(dtype="datetime64[ns]").astype(np.int64) / _NS_PER_DAY, np.inf)
+    cents = np.round(amount * 100)
+    valid = (vendor_codes >= 0) & np.isfinite(amount)
+
+    # 1. Exact: hash group (vendor, cents), earliest row of each group is the original
+    positions = np.flatnonzero(valid)
+    positions = positions[np.lexsort((positions, day[positions]))]
+    keys = pd.DataFrame({"vendor": vendor_codes[positions], "cents": cents[positions]})
+    first = pd.Series(positions).groupby([keys["vendor"], keys["cents"]], sort=False).transform("first").to_numpy()
+    repeat = first != positions
+    original[positions[repeat]] = first[repeat]
+    kind[positions[repeat]] = "exact"
+
+    # 2. Near: sort-and-sweep over the invoices not already exact duplicates
+    candidates = np.flatnonzero(valid & has_date & (original < 0))
+    order = candidates[np.lexsort((day[candidates], amount[candidates], vendor_codes[candidates]))]
+    v, a, d = vendor_codes[order], amount[order], day[order]
+    limit = amount_tolerance * np.abs(a)
+    for k in range(1, len(order)):
+        similar = (v[k:] == v[:-k]) & (a[k:] - a[:-k] <= limit[k:])
+        if not similar.any():
+            break
+        pair = np.flatnonzero(similar & (np.abs(d[k:] - d[:-k]) <= date_window_days))
+        if len(pair) == 0:
+            continue
+        hi, lo = order[pair + k], order[pair]
+        # The later invoice (by date, then file order) is the duplicate
+        hi_later = (day[hi] > day[lo]) | ((day[hi] == day[lo]) & (hi > lo))
+        later = np.where(hi_later, hi, lo)
+        earlier = np.where(hi_later, lo, hi)
+        free = original[later] < 0
+        original[later[free]] = earlier[free]
+        kind[later[free]] = "near"
+
+    return original, kind
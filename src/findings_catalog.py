@@ -0,0 +1,398 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+# Allow `python src/findings_catalog.py` as well as `from src.findings_catalog import ...`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.evidence import file_sha256
+
+# ----------------------------
+# Findings catalog
+# ----------------------------
+# Every run leaves timestamped evidence files in data/audit_reports/
+# (ghost_vendors_<ts>.csv, po_variance_<ts>.csv, ...). The catalog ingests
+# each of them once into an indexed SQLite store, so "has this vendor been
+# flagged before?" is one index lookup instead of parsing hundreds of CSVs.
+#
+# Tables:
+#   findings(run_ts, check_name, invoice_id, vendor_id, amount, record)
+#       indexed by vendor_id, invoice_id and (check_name, run_ts);
+#       record = the full evidence row as JSON
+#   sources(file, check_name, run_ts, fmt, rows, bytes, sha256, ingested_at, archived_to)
+#       one row per evidence file seen (ingested, or skipped as another format
+#       of an already ingested table)
+#
+# Retention (opt-in, never part of an audit run): `findings_catalog.py --retention`
+# takes evidence files older than retention_days, once ingested, and either
+# compacts them into data/audit_reports/archive/evidence_<YYYYMM>.zip
+# ("compact", lossless) or deletes them ("prune"). The findings stay queryable.
+
+DEFAULT_CATALOG_PATH = "data/cache/findings_catalog.sqlite"
+DEFAULT_RETENTION_DAYS = 90
+RETENTION_MODES = ("compact", "prune", "off")
+
+# Evidence table -> column holding the flagged amount (None = no amount)
+CATALOG_CHECKS = {
+    "ghost_vendors": "InvoiceAmount",
+    "po_variance": "InvoiceAmount",
+    "high_value": "InvoiceAmount",
+    "duplicate_invoices": "InvoiceAmount",
+    "foip_ai_findings": None,
+}
+# Preferred source when one table was written in several formats
+_FORMAT_PREFERENCE = ("csv", "zip", "parquet")
+_EVIDENCE_FILE = re.compile(
+    r"^(?P<check>" + "|".join(CATALOG_CHECKS) + r")_(?P<ts>\d{8}_\d{6})\.(?P<ext>csv|csv\.zip|parquet)$"
+)
+_MANIFEST_FILE = re.compile(r"^evidence_manifest_(?P<ts>\d{8}_\d{6})\.json$")
+_EXT_FORMAT = {"csv": "csv", "csv.zip": "zip", "parquet": "parquet"}
+_FINDING_COLUMNS = ["run_ts", "check_name", "InvoiceID", "VendorID", "amount", "record"]
+
+
+def _run_ts(stamp: str) -> str:
+    """'20250101_093000' -> '2025-01-01 09:30:00' (sorts and compares as text)."""
+    return datetime.strptime(stamp, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+
+
+def scan_evidence_dir(report_dir) -> list:
+    """Evidence files in report_dir as dicts {file, path, check, stamp, fmt}."""
+    if not os.path.isdir(report_dir):
+        return []
+    found = []
+    for name in sorted(os.listdir(report_dir)):
+        m = _EVIDENCE_FILE.match(name)
+        if m:
+            found.append(
+                {
+                    "file": name,
+                    "path": os.path.join(report_dir, name),
+                    "check": m.group("check"),
+                    "stamp": m.group("ts"),
+                    "fmt": _EXT_FORMAT[m.group("ext")],
+                }
+            )
+    return found
+
+
+def _read_evidence(path, fmt) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    # IDs stay text ("INV-0001", "V-007"); zip is read through pandas' compression support
+    return pd.read_csv(path, dtype={"InvoiceID": str, "VendorID": str}, keep_default_na=False, na_values=[""])
+
+
+class FindingsCatalog:
+    """
+    catalog = FindingsCatalog()
+    catalog.ingest_reports("data/audit_reports")  -> findings added
+    catalog.vendor_history("V-999")               -> every finding for that vendor
+    catalog.flagged_before(["V-999", "V-998"])    -> per-vendor counts / first & last run
+    catalog.apply_retention("data/audit_reports", retention_days=90, mode="compact")
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Shared by the dashboard's reruns (different threads), so guard it like NerCache
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS findings ("
+            " run_ts TEXT NOT NULL,"
+            " check_name TEXT NOT NULL,"
+            " invoice_id TEXT,"
+            " vendor_id TEXT,"
+            " amount REAL,"
+            " record TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_findings_vendor ON findings(vendor_id, run_ts);"
+            "CREATE INDEX IF NOT EXISTS idx_findings_invoice ON findings(invoice_id, run_ts);"
+            "CREATE INDEX IF NOT EXISTS idx_findings_check ON findings(check_name, run_ts);"
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " file TEXT PRIMARY KEY,"
+            " check_name TEXT NOT NULL,"
+            " run_ts TEXT NOT NULL,"
+            " fmt TEXT,"
+            " rows INTEGER,"
+            " bytes INTEGER,"
+            " sha256 TEXT,"
+            " ingested_at TEXT,"
+            " archived_to TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_sources_run ON sources(check_name, run_ts);"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ----------------------------
+    # Ingestion
+    # ----------------------------
+    def ingest_reports(self, report_dir) -> int:
+        """
+        Ingests every evidence file in report_dir not seen before; returns the
+        number of findings added. A table exported in several formats is read
+        once (csv, else zip, else parquet); the other files are only registered.
+        """
+        with self._lock:
+            known = {f for (f,) in self._conn.execute("SELECT file FROM sources")}
+            done = set(self._conn.execute("SELECT check_name, run_ts FROM sources WHERE rows IS NOT NULL"))
+
+        groups = {}
+        for entry in scan_evidence_dir(report_dir):
+            if entry["file"] not in known:
+                groups.setdefault((entry["check"], _run_ts(entry["stamp"])), []).append(entry)
+
+        added = 0
+        for (check, run_ts), entries in sorted(groups.items(), key=lambda kv: kv[0][1]):
+            entries.sort(key=lambda e: _FORMAT_PREFERENCE.index(e["fmt"]))
+            source = None if (check, run_ts) in done else entries[0]
+            rows = []
+            if source is not None:
+                rows = self._finding_rows(_read_evidence(source["path"], source["fmt"]), check, run_ts)
+            now = datetime.now().isoformat(timespec="seconds")
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT INTO findings (run_ts, check_name, invoice_id, vendor_id, amount, record)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sources"
+                    " (file, check_name, run_ts, fmt, rows, bytes, sha256, ingested_at, archived_to)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                    [
+                        (
+                            e["file"], check, run_ts, e["fmt"],
+                            len(rows) if e is source else None,
+                            os.path.getsize(e["path"]), file_sha256(e["path"]), now,
+                        )
+                        for e in entries
+                    ],
+                )
+                self._conn.commit()
+            added += len(rows)
+        return added
+
+    @staticmethod
+    def _finding_rows(df: pd.DataFrame, check, run_ts) -> list:
+        amount_col = CATALOG_CHECKS[check]
+        n = len(df)
+
+        def ids(column):
+            if column not in df.columns:
+                return pd.Series([None] * n)
+            return df[column].astype(str).where(df[column].notna(), None)
+
+        invoice, vendor = ids("InvoiceID"), ids("VendorID")
+        if amount_col and amount_col in df.columns:
+            amount = pd.to_numeric(df[amount_col], errors="coerce").astype(object)
+            amount = amount.where(amount.notna(), None)
+        else:
+            amount = pd.Series([None] * n)
+        records = df.to_json(orient="records", lines=True, date_format="iso").splitlines() if n else []
+        return list(zip([run_ts] * n, [check] * n, invoice.tolist(), vendor.tolist(), amount.tolist(), records))
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def _query(self, sql, params=()) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=_FINDING_COLUMNS)
+
+    def findings(self, check=None, vendor_id=None, invoice_id=None, since=None, until=None, limit=None):
+        """
+        Findings filtered by any of check / VendorID / InvoiceID / run time range
+        (since/until: 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'), newest run first.
+        """
+        where, params = [], []
+        for column, value in (("check_name", check), ("vendor_id", vendor_id), ("invoice_id", invoice_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(str(value))
+        if since:
+            where.append("run_ts >= ?")
+            params.append(str(since))
+        if until:
+            where.append("run_ts < ?")
+            params.append(str(until))
+        sql = "SELECT run_ts, check_name, invoice_id, vendor_id, amount, record FROM findings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY run_ts DESC, rowid"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def vendor_history(self, vendor_id, limit=None) -> pd.DataFrame:
+        return self.findings(vendor_id=vendor_id, limit=limit)
+
+    def invoice_history(self, invoice_id, limit=None) -> pd.DataFrame:
+        return self.findings(invoice_id=invoice_id, limit=limit)
+
+    def flagged_before(self, vendor_ids, before=None, check=None) -> pd.DataFrame:
+        """
+        Per VendorID: how many earlier findings / runs flagged it and when first/last.
+        Vendors never flagged are left out. before: only runs strictly before this time.
+        """
+        ids = sorted({str(v) for v in vendor_ids})
+        out = []
+        with self._lock:
+            # SQLite caps bound parameters, so look vendors up in slices.
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                sql = (
+                    "SELECT vendor_id, COUNT(*), COUNT(DISTINCT run_ts), MIN(run_ts), MAX(run_ts),"
+                    " GROUP_CONCAT(DISTINCT check_name) FROM findings"
+                    f" WHERE vendor_id IN ({','.join('?' * len(part))})"
+                )
+                params = list(part)
+                if before:
+                    sql += " AND run_ts < ?"
+                    params.append(str(before))
+                if check:
+                    sql += " AND check_name = ?"
+                    params.append(check)
+                out.extend(self._conn.execute(sql + " GROUP BY vendor_id", params).fetchall())
+        return pd.DataFrame(out, columns=["VendorID", "findings", "runs", "first_seen", "last_seen", "checks"])
+
+    def runs(self) -> pd.DataFrame:
+        """One row per run timestamp with the findings count per check."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_ts, check_name, rows FROM sources WHERE rows IS NOT NULL"
+            ).fetchall()
+        if not rows:
+            return pd.DataFrame(columns=["run_ts"])
+        table = pd.DataFrame(rows, columns=["run_ts", "check_name", "rows"])
+        return (
+            table.pivot_table(index="run_ts", columns="check_name", values="rows", aggfunc="sum")
+            .sort_index(ascending=False)
+            .reset_index()
+        )
+
+    # ----------------------------
+    # Retention
+    # ----------------------------
+    def apply_retention(self, report_dir, retention_days=DEFAULT_RETENTION_DAYS, mode="compact", now=None) -> dict:
+        """
+        Compacts (zip into report_dir/archive/) or prunes evidence files and
+        manifests older than retention_days. Files are ingested first, so their
+        findings stay in the catalog. Returns {"files", "bytes"} removed.
+        """
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"❌ Unknown retention mode: {mode}. Use {RETENTION_MODES}")
+        summary = {"files": 0, "bytes": 0, "archives": []}
+        if mode == "off" or not retention_days:
+            return summary
+
+        self.ingest_reports(report_dir)
+        cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+
+        old = []
+        for name in sorted(os.listdir(report_dir)):
+            m = _EVIDENCE_FILE.match(name) or _MANIFEST_FILE.match(name)
+            if m and datetime.strptime(m.group("ts"), "%Y%m%d_%H%M%S") < cutoff:
+                old.append((name, m.group("ts")))
+
+        archive_dir = os.path.join(report_dir, "archive")
+        for name, stamp in old:
+            path = os.path.join(report_dir, name)
+            archived_to = None
+            if mode == "compact":
+                os.makedirs(archive_dir, exist_ok=True)
+                archived_to = os.path.join(archive_dir, f"evidence_{stamp[:6]}.zip")
+                with zipfile.ZipFile(archived_to, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+                    if name not in zf.namelist():
+                        zf.write(path, arcname=name)
+                if archived_to not in summary["archives"]:
+                    summary["archives"].append(archived_to)
+            summary["bytes"] += os.path.getsize(path)
+            summary["files"] += 1
+            os.remove(path)
+            with self._lock:
+                self._conn.execute("UPDATE sources SET archived_to = ? WHERE file = ?", (archived_to or "pruned", name))
+        with self._lock:
+            self._conn.commit()
+        return summary
+
+
+def catalog_settings(config: dict) -> dict:
+    """catalog_settings from the audit config (path, auto_ingest, retention_days, retention_mode)."""
+    settings = config.get("catalog_settings", {}) or {}
+    mode = settings.get("retention_mode") or "off"
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"❌ Unknown retention mode: {mode}. Use {RETENTION_MODES}")
+    return {
+        "path": settings.get("path") or DEFAULT_CATALOG_PATH,
+        "auto_ingest": bool(settings.get("auto_ingest", True)),
+        "retention_days": settings.get("retention_days", DEFAULT_RETENTION_DAYS),
+        "retention_mode": mode,
+    }
+
+
+def update_catalog(report_dir, config: dict):
+    """
+    After-run hook: ingest the new evidence files (evidence is never moved or
+    deleted here; see --retention). Returns the findings added, or None when
+    auto_ingest is off.
+    """
+    settings = catalog_settings(config)
+    if not settings["auto_ingest"]:
+        return None
+    catalog = FindingsCatalog(settings["path"])
+    try:
+        return catalog.ingest_reports(report_dir)
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    from src.rule_engine import DEFAULT_CONFIG_PATH, REPORT_DIR, load_config
+
+    parser = argparse.ArgumentParser(description="Query the catalog of historical audit findings.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--report-dir", default=REPORT_DIR)
+    parser.add_argument("--vendor", default=None, help="Every finding for this VendorID.")
+    parser.add_argument("--invoice", default=None, help="Every finding for this InvoiceID.")
+    parser.add_argument("--check", default=None, choices=list(CATALOG_CHECKS))
+    parser.add_argument("--since", default=None, help="Only runs at/after this date (YYYY-MM-DD).")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--runs", action="store_true", help="List ingested runs with findings per check.")
+    parser.add_argument("--retention", nargs="?", const="", default=None, choices=["", "compact", "prune"],
+                        metavar="{compact,prune}",
+                        help="Compact/prune evidence older than retention_days now "
+                             "(mode defaults to catalog_settings.retention_mode).")
+    args = parser.parse_args()
+
+    settings = catalog_settings(load_config(args.config))
+    catalog = FindingsCatalog(settings["path"])
+    print(f"🗂️  Catalog: {settings['path']} (+{catalog.ingest_reports(args.report_dir)} new findings)")
+
+    if args.retention is not None:
+        mode = args.retention or settings["retention_mode"]
+        if mode == "off":
+            print("⏭️  Retention is off: pass --retention compact|prune or set catalog_settings.retention_mode.")
+        else:
+            removed = catalog.apply_retention(args.report_dir, settings["retention_days"], mode)
+            print(f"🧹 Retention ({mode}, {settings['retention_days']} days): "
+                  f"{removed['files']} files, {removed['bytes'] / 1024:.0f} KB")
+    if args.runs:
+        print(catalog.runs().to_string(index=False))
+    if args.vendor or args.invoice or args.check or args.since:
+        found = catalog.findings(check=args.check, vendor_id=args.vendor, invoice_id=args.invoice,
+                                 since=args.since, limit=args.limit)
+        print(found.drop(columns="record").to_string(index=False) if len(found) else "✅ No findings.")
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.rule_engine import audit_invoices, closest_vendor_settings
+from src.schema import as_numeric
+from src.vendor_index import as_vendor_index
+
+# ----------------------------
+# Incremental (delta) audits
+# ----------------------------
+# Nightly dumps are mostly yesterday's rows again. The state store remembers,
+# per invoice row, a hash of its content and the findings it produced. The
+# next run only re-checks rows that are new or whose hash changed, and carries
+# the stored findings forward for everything else.
+#
+# Findings also depend on things outside the row (vendor master, thresholds,
+# NER model), so each family of checks stores a fingerprint of those inputs;
+# when it changes, that family is re-run for every row.
+
+DEFAULT_STATE_PATH = "data/cache/audit_state.sqlite"
+
+
+def fingerprint(payload) -> str:
+    """Stable sha256 of any JSON-able settings payload."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def row_keys(invoices: pd.DataFrame) -> pd.Series:
+    """
+    InvoiceID plus its occurrence number, so repeated IDs in one dump
+    still get their own state rows ("INV-1#0", "INV-1#1", ...).
+    """
+    ids = invoices["InvoiceID"].astype(str)
+    return ids + "#" + ids.groupby(ids).cumcount().astype(str)
+
+
+def row_hashes(invoices: pd.DataFrame) -> pd.Series:
+    """Content hash of every row (all columns, index ignored), as hex strings."""
+    hashed = pd.util.hash_pandas_object(invoices, index=False)
+    return pd.Series([f"{h:016x}" for h in hashed.to_numpy()], index=invoices.index)
+
+
+class AuditStateStore:
+    """
+    SQLite store of InvoiceID-key -> row hash + prior findings.
+
+    Tables:
+      rows(key, row_hash, ghost, variance, variance_breach, ai_hash, ai_flags)
+      meta(name, value) -- fingerprints of the rule / AI settings last used
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " key TEXT PRIMARY KEY,"
+            " row_hash TEXT,"
+            " ghost INTEGER,"
+            " variance REAL,"
+            " variance_breach INTEGER,"
+            " ai_hash TEXT,"
+            " ai_flags TEXT);"
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._conn.commit()
+
+    def get_meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def load_rows(self) -> pd.DataFrame:
+        return pd.read_sql("SELECT * FROM rows", self._conn).set_index("key")
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def upsert_rows(self, state: pd.DataFrame) -> None:
+        """Inserts/overwrites the given rows (index = row key)."""
+        records = [
+            (
+                key,
+                r.row_hash,
+                int(r.ghost),
+                None if pd.isna(r.variance) else float(r.variance),
+                int(r.variance_breach),
+                r.ai_hash,
+                r.ai_flags,
+            )
+            for key, r in zip(state.index, state.itertuples(index=False))
+        ]
+        self._conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+
+    def retain_keys(self, keys) -> None:
+        """Drops state for rows that are no longer in the dump."""
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_keys (key TEXT PRIMARY KEY)")
+        self._conn.execute("DELETE FROM current_keys")
+        self._conn.executemany("INSERT OR IGNORE INTO current_keys VALUES (?)", ((k,) for k in keys))
+        self._conn.execute("DELETE FROM rows WHERE key NOT IN (SELECT key FROM current_keys)")
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def audit_incremental(invoices, master_list, config, store, ai_scan=None, ai_settings=None) -> dict:
+    """
+    Runs the rule checks (and optionally the FOIP/PII scan) only on rows that are
+    new or changed since the last run, then merges with carried-forward findings.
+
+    - ai_scan: callable(df) -> findings frame (InvoiceID, RiskContent, DetectedFlags);
+      None skips the AI part entirely
+    - ai_settings: anything that changes AI results (model, threshold, prefilter...)
+
+    High value and duplicate invoices are not carried in the state store: they are
+    re-run on the whole frame every time (duplicates compare rows with each other,
+    and both are a few vectorized passes).
+
+    Returns limit, rules, ghosts, failures, high_value and duplicates (as
+    audit_invoices, without invoices_with_variance) plus "ai_findings" and "stats".
+    """
+    vendors = as_vendor_index(master_list)
+    financial = config.get("financial_limits", {})
+    limit = float(financial.get("max_po_variance", 0.10))
+
+    keys = row_keys(invoices)
+    hashes = row_hashes(invoices)
+
+    prior = store.load_rows().reindex(keys.to_numpy())
+    prior.index = invoices.index
+    seen_hash = prior["row_hash"]
+
+    rules_fp = fingerprint(
+        {
+            "vendors": vendors.fingerprint(),
+            "financial_limits": financial,
+            "risk_settings": config.get("risk_settings", {}),
+            "rules": config.get("rules", {}),
+        }
+    )
+    ai_fp = fingerprint(ai_settings or {})
+    rules_stale = store.get_meta("rules_fingerprint") != rules_fp
+    ai_stale = store.get_meta("ai_fingerprint") != ai_fp
+
+    changed = (seen_hash != hashes) | seen_hash.isna()
+    rule_todo = pd.Series(True, index=invoices.index) if rules_stale else changed
+
+    # ---- Rule checks on new/changed rows only ----
+    ghost = pd.to_numeric(prior["ghost"], errors="coerce").fillna(0).astype(bool)
+    variance = pd.to_numeric(prior["variance"], errors="coerce").astype(float)
+    breach = pd.to_numeric(prior["variance_breach"], errors="coerce").fillna(0).astype(bool)
+    if rule_todo.any():
+        delta = audit_invoices(invoices[rule_todo], vendors, config, lean=True)
+        ghost[rule_todo] = delta.mask("ghosts")
+        variance[rule_todo] = pd.to_numeric(delta.variance, errors="coerce").to_numpy(dtype=float)
+        breach[rule_todo] = delta.mask("failures")
+
+    # ---- FOIP/PII scan on new/changed rows only ----
+    ai_flags = prior["ai_flags"].where(prior["ai_hash"] == hashes)
+    ai_todo = pd.Series(False, index=invoices.index)
+    if ai_scan is not None:
+        ai_todo = ai_flags.isna() if not ai_stale else pd.Series(True, index=invoices.index)
+        ai_flags = ai_flags.where(~ai_todo)
+        if ai_todo.any():
+            # Scan under the row keys so findings map back to exact rows
+            subset = invoices[ai_todo].copy()
+            subset["InvoiceID"] = keys[ai_todo].to_numpy()
+            found = ai_scan(subset)
+            flags_by_key = dict(zip(found.get("InvoiceID", []), found.get("DetectedFlags", [])))
+            ai_flags[ai_todo] = keys[ai_todo].map(flags_by_key).fillna("").to_numpy()
+
+    state = pd.DataFrame(
+        {
+            "row_hash": hashes.to_numpy(),
+            "ghost": ghost.to_numpy(),
+            "variance": variance.to_numpy(),
+            "variance_breach": breach.to_numpy(),
+            "ai_hash": np.where(ai_flags.notna(), hashes, None),
+            "ai_flags": ai_flags.to_numpy(),
+        },
+        index=keys.to_numpy(),
+    )
+    # Only rows we actually (re)computed are written back
+    store.upsert_rows(state[(rule_todo | ai_todo).to_numpy()])
+    if store.count() > len(state):
+        store.retain_keys(state.index)
+    store.set_meta("rules_fingerprint", rules_fp)
+    if ai_scan is not None:
+        store.set_meta("ai_fingerprint", ai_fp)
+    store.commit()
+
+    # ---- Whole-frame checks (only the masks asked for below are evaluated) ----
+    whole = audit_invoices(invoices, vendors, config, lean=True)
+
+    # ---- Materialize current findings (rows come from today's dump) ----
+    ghosts = invoices[ghost.to_numpy()].copy()
+    closest = closest_vendor_settings(config)
+    if closest["enabled"]:
+        # Cheap to recompute: only the (few, repetitive) ghost IDs are looked up
+        matches = vendors.closest(ghosts["VendorID"], ghosts.get("VendorName"), closest["min_similarity"])
+        ghosts["ClosestVendor"] = matches["ClosestVendor"].to_numpy()
+        ghosts["VendorSimilarity"] = matches["VendorSimilarity"].to_numpy()
+    failures = invoices[breach.to_numpy()].copy()
+    failures["InvoiceAmount"] = as_numeric(failures.get("InvoiceAmount"))
+    failures["PO_Amount"] = as_numeric(failures.get("PO_Amount"))
+    failures["Variance"] = variance[breach].to_numpy()
+
+    flagged = ai_flags.fillna("") != ""
+    ai_findings = pd.DataFrame(
+        {
+            "InvoiceID": invoices.loc[flagged, "InvoiceID"].to_numpy(),
+            "RiskContent": invoices.loc[flagged, "Notes"].to_numpy() if "Notes" in invoices else None,
+            "DetectedFlags": ai_flags[flagged].to_numpy(),
+        },
+        columns=["InvoiceID", "RiskContent", "DetectedFlags"],
+    )
+
+    return {
+        "limit": limit,
+        "rules": whole.checks,
+        "ghosts": ghosts,
+        "failures": failures,
+        "high_value": whole.materialize("high_value"),
+        "duplicates": whole.materialize("duplicates"),
+        "ai_findings": ai_findings,
+        "stats": {
+            "rows": int(len(invoices)),
+            "new_or_changed": int(changed.sum()),
+            "rule_rows_checked": int(rule_todo.sum()),
+            "ai_rows_scanned": int(ai_todo.sum()),
+            "rules_settings_changed": bool(rules_stale),
+            "ai_settings_changed": bool(ai_stale and ai_scan is not None),
+        },
+    }
@@ -0,0 +1,207 @@
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from src.schema import apply_invoice_schema, format_schema_report, schema_tag
+
+# ----------------------------
+# Columnar ingestion cache
+# ----------------------------
+# Parsing invoices.xlsx with openpyxl is the slowest step of a run, and the
+# rule engine, the AI auditor and every dashboard rerun used to do it again.
+# The first read converts the source into an Arrow IPC (Feather v2) file;
+# every later read memory-maps that file instead of re-parsing the workbook.
+#
+# Cache layout (under cache_dir):
+#   <content sha256>.arrow   the columnar copy (shared by identical files)
+#   <path key>.json          path, mtime, size, sha256 of the source we last saw
+#
+# A source is a hit when path + mtime + size match the stored meta (no hashing),
+# or when its content hash matches an existing .arrow file (e.g. after a touch/copy).
+#
+# With a schema (see src/schema.py) the typed frame is cached instead, as
+# <content sha256>.<schema tag>.arrow plus its memory report (.schema.json),
+# so the conversion also happens only once per file.
+
+DEFAULT_INGEST_CACHE_DIR = "data/cache/ingest"
+_HASH_BLOCK = 1 << 20
+
+
+def ingest_cache_dir(config: dict):
+    """ingest_settings.cache_dir from the audit config (None/empty = no cache)."""
+    ingest = config.get("ingest_settings", {}) or {}
+    return ingest.get("cache_dir", DEFAULT_INGEST_CACHE_DIR) or None
+
+
+def _read_source(source, name=""):
+    """Parses the original file (or uploaded file object) with pandas."""
+    lowered = str(name or source).lower()
+    if lowered.endswith((".xlsx", ".xlsm", ".xls")):
+        return pd.read_excel(source)
+    if lowered.endswith(".parquet"):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+
+def _sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _arrow_modules():
+    """pyarrow is optional (it ships with streamlit); without it we just parse the source."""
+    try:
+        import pyarrow.feather as feather
+        return feather
+    except ImportError:
+        return None
+
+
+def _load_arrow(feather, arrow_path, schema=None) -> pd.DataFrame:
+    table = feather.read_table(arrow_path, memory_map=True)
+    if schema is None:
+        return table.to_pandas()
+    # Typed copies keep their strings in Arrow buffers instead of converting to Python objects
+    import pyarrow as pa
+
+    string_types = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+    df = table.to_pandas(types_mapper=string_types.get)
+    report_path = f"{arrow_path}.schema.json"
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            df.attrs["schema_report"] = json.load(f)
+    return df
+
+
+def _write_arrow(feather, df: pd.DataFrame, arrow_path: str) -> bool:
+    """Writes the columnar copy atomically. Returns False if the frame can't be stored as Arrow."""
+    tmp_path = f"{arrow_path}.tmp-{os.getpid()}"
+    try:
+        # Uncompressed so readers can memory-map it without a decode step
+        feather.write_feather(df, tmp_path, compression="uncompressed")
+    except Exception as e:  # mixed-type object columns etc. -> just don't cache
+        print(f"⚠️  Ingestion cache skipped ({type(e).__name__}: {e})")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, arrow_path)
+    return True
+
+
+def _arrow_path(cache_dir, sha256, schema=None) -> str:
+    suffix = "" if schema is None else f".{schema_tag(schema)}"
+    return os.path.join(cache_dir, f"{sha256}{suffix}.arrow")
+
+
+def _parse(source, name="", schema=None) -> pd.DataFrame:
+    """Parses the source, then applies the schema (printing its memory report) if one is given."""
+    df = _read_source(source, name)
+    if schema is not None:
+        df = apply_invoice_schema(df, schema)
+        print(format_schema_report(df.attrs["schema_report"]))
+    return df
+
+
+def _store(feather, df, arrow_path, schema=None) -> bool:
+    stored = _write_arrow(feather, df, arrow_path)
+    if stored and schema is not None:
+        with open(f"{arrow_path}.schema.json", "w") as f:
+            json.dump(df.attrs["schema_report"], f)
+    return stored
+
+
+def _meta_path(cache_dir, abs_path) -> str:
+    return os.path.join(cache_dir, f"{hashlib.sha1(abs_path.encode()).hexdigest()[:16]}.json")
+
+
+def content_hash(source, cache_dir=DEFAULT_INGEST_CACHE_DIR) -> str:
+    """
+    sha256 of a source's bytes (path or file-like), e.g. as a cache key for
+    results derived from the file. For paths the ingestion meta is reused
+    while mtime + size are unchanged, so repeated calls do not re-hash.
+    """
+    if hasattr(source, "read"):
+        data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+        return hashlib.sha256(data).hexdigest()
+
+    path = os.fspath(source)
+    stat = os.stat(path)
+    if cache_dir:
+        meta_path = _meta_path(cache_dir, os.path.abspath(path))
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+                return meta["sha256"]
+    return _sha256_file(path)
+
+
+def load_table(source, cache_dir=DEFAULT_INGEST_CACHE_DIR, schema=None) -> pd.DataFrame:
+    """
+    Reads an Excel/CSV source through the columnar cache.
+
+    - source: a file path, or a file-like object (e.g. a Streamlit upload)
+    - cache_dir: where .arrow copies live; None disables the cache
+    - schema: column -> kind (e.g. src.schema.INVOICE_SCHEMA); applied once on
+      parse, and the typed frame is what gets cached
+    Raises FileNotFoundError for missing paths, like pd.read_excel / read_csv.
+    """
+    feather = _arrow_modules() if cache_dir else None
+
+    # Uploaded files: no path/mtime, so key on the bytes alone
+    if hasattr(source, "read"):
+        data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+        name = getattr(source, "name", "")
+        if feather is None:
+            return _parse(io.BytesIO(data), name, schema)
+        os.makedirs(cache_dir, exist_ok=True)
+        arrow_path = _arrow_path(cache_dir, hashlib.sha256(data).hexdigest(), schema)
+        if os.path.exists(arrow_path):
+            return _load_arrow(feather, arrow_path, schema)
+        df = _parse(io.BytesIO(data), name, schema)
+        _store(feather, df, arrow_path, schema)
+        return df
+
+    path = os.fspath(source)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if feather is None:
+        return _parse(path, schema=schema)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    abs_path = os.path.abspath(path)
+    stat = os.stat(path)
+    meta_path = _meta_path(cache_dir, abs_path)
+
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    # Fast path: same file, untouched since last time -> no hashing at all
+    if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+        arrow_path = _arrow_path(cache_dir, meta["sha256"], schema)
+        if os.path.exists(arrow_path):
+            return _load_arrow(feather, arrow_path, schema)
+
+    sha256 = _sha256_file(path)
+    arrow_path = _arrow_path(cache_dir, sha256, schema)
+    if os.path.exists(arrow_path):
+        df = _load_arrow(feather, arrow_path, schema)
+        cached = True
+    else:
+        df = _parse(path, schema=schema)
+        cached = _store(feather, df, arrow_path, schema)
+
+    if cached:
+        with open(meta_path, "w") as f:
+            json.dump(
+                {"path": abs_path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}, f
+            )
+    return df
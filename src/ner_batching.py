@@ -0,0 +1,199 @@
+import re
+import time
+
+from src.telemetry import observe
+
+# ----------------------------
+# Length-aware NER batching
+# ----------------------------
+# Notes range from three words to pasted email threads. Two problems with
+# handing them to the pipeline as-is:
+#
+# - a batch is padded to its longest note, so one long note in a batch of
+#   short ones multiplies the work of the whole batch;
+# - BERT reads at most 512 tokens; anything after that is cut off (or the
+#   call fails), so a name late in a long thread is never seen.
+#
+# Each note is tokenized once into a "layout": its token count and the char
+# spans of the windows the model will read. Short notes are one window; long
+# notes become overlapping windows of max_tokens (overlap tokens shared, so an
+# entity on a boundary is seen whole by at least one window). All windows are
+# then sorted by length and batched, so every batch holds similar lengths.
+# Entities are shifted back to note offsets and merged per note.
+#
+# Layouts are memoized per note text for the life of a TokenLayouts (one scan,
+# or one scan service / pool worker). Across runs, a note seen before is
+# answered by the NER result cache and never reaches the tokenizer.
+#
+# Pipelines without a tokenizer (test doubles, custom callables) are windowed
+# on whitespace-separated words instead of tokens.
+
+DEFAULT_MAX_TOKENS = 510   # 512 minus [CLS] / [SEP]
+DEFAULT_WINDOW_OVERLAP = 64
+_WORD_RE = re.compile(r"\S+")
+_TOKENIZE_CHUNK = 10_000  # notes per tokenizer call
+
+
+def max_tokens_for(nlp, max_tokens=DEFAULT_MAX_TOKENS) -> int:
+    """max_tokens, clamped to what the pipeline's model can actually read."""
+    tokenizer = getattr(nlp, "tokenizer", None)
+    model_max = getattr(tokenizer, "model_max_length", None)
+    if isinstance(model_max, int) and model_max < 100_000:
+        special = tokenizer.num_special_tokens_to_add() if hasattr(tokenizer, "num_special_tokens_to_add") else 2
+        return max(1, min(max_tokens, model_max - special))
+    return max_tokens
+
+
+def _token_spans(nlp, texts) -> list:
+    """Char (start, end) of every token per text; word spans when there is no usable tokenizer."""
+    tokenizer = getattr(nlp, "tokenizer", None)
+    if tokenizer is not None:
+        texts = list(texts)
+        try:
+            spans = []
+            for start in range(0, len(texts), _TOKENIZE_CHUNK):
+                encoded = tokenizer(
+                    texts[start:start + _TOKENIZE_CHUNK],
+                    add_special_tokens=False, return_offsets_mapping=True, truncation=False, verbose=False,
+                )
+                spans.extend([tuple(span) for span in offsets] for offsets in encoded["offset_mapping"])
+            return spans
+        except (NotImplementedError, TypeError, ValueError, KeyError):
+            pass  # slow tokenizers have no offset mapping
+    return [[m.span() for m in _WORD_RE.finditer(text)] for text in texts]
+
+
+def _layout(text, spans, max_tokens, overlap) -> dict:
+    n = len(spans)
+    if n <= max_tokens:
+        return {"tokens": n, "windows": [[0, len(text), n]]}
+    windows = []
+    start = 0
+    while True:
+        end = min(start + max_tokens, n)
+        windows.append([spans[start][0], spans[end - 1][1], end - start])
+        if end == n:
+            return {"tokens": n, "windows": windows}
+        start = end - min(overlap, max_tokens - 1)
+
+
+class TokenLayouts:
+    """
+    layouts = TokenLayouts(nlp)
+    layouts.get(texts) -> {text: {"tokens": n, "windows": [[char_start, char_end, n_tokens], ...]}}
+
+    Tokenizes only texts this instance has not seen before.
+    """
+
+    def __init__(self, nlp, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_WINDOW_OVERLAP):
+        self.nlp = nlp
+        self.max_tokens = max_tokens_for(nlp, max_tokens)
+        self.overlap = int(overlap)
+        self._memo = {}
+        self.tokenized = 0
+
+    def get(self, texts) -> dict:
+        missing = [t for t in dict.fromkeys(texts) if t not in self._memo]
+        if missing:
+            fresh = {
+                text: _layout(text, spans, self.max_tokens, self.overlap)
+                for text, spans in zip(missing, _token_spans(self.nlp, missing))
+            }
+            self.tokenized += len(fresh)
+            self._memo.update(fresh)
+        return {t: self._memo[t] for t in texts}
+
+
+def merge_window_entities(parts) -> list:
+    """
+    Entities of one note from its windows (already in note offsets): overlapping
+    windows report the same entity twice, so overlapping spans of the same group
+    keep only the highest-scoring one. Entities without offsets dedupe on (group, word).
+    """
+    merged, no_span = [], {}
+    for ent in sorted((e for p in parts for e in p), key=lambda e: (e.get("start") is None, e.get("start") or 0)):
+        if ent.get("start") is None or ent.get("end") is None:
+            key = (ent.get("entity_group"), ent.get("word"))
+            if key not in no_span or float(ent.get("score", 0)) > float(no_span[key].get("score", 0)):
+                no_span[key] = ent
+            continue
+        last = merged[-1] if merged else None
+        if last is not None and last.get("entity_group") == ent.get("entity_group") and ent["start"] < last["end"]:
+            if float(ent.get("score", 0)) > float(last.get("score", 0)):
+                merged[-1] = ent
+            continue
+        merged.append(ent)
+    return merged + list(no_span.values())
+
+
+def _shift(entities, offset) -> list:
+    if not offset:
+        return list(entities)
+    shifted = []
+    for ent in entities:
+        ent = dict(ent)
+        if ent.get("start") is not None:
+            ent["start"] += offset
+        if ent.get("end") is not None:
+            ent["end"] += offset
+        shifted.append(ent)
+    return shifted
+
+
+def iter_ner_bucketed(nlp, texts, batch_size, layouts, stats=None):
+    """
+    Runs every window of `texts` through nlp in length-sorted batches and yields
+    (positions, entities) for the notes completed by each batch (positions index
+    into texts). batch_size <= 1 keeps one call per window.
+    stats (dict), when given, collects windows / long_notes / padding_fraction.
+    """
+    texts = list(texts)
+    layout_of = layouts.get(texts)
+    units = []  # (n_tokens, text position, char_start, char_end)
+    remaining = []
+    for pos, text in enumerate(texts):
+        windows = layout_of[text]["windows"]
+        remaining.append(len(windows))
+        units.extend((n_tok, pos, start, end) for start, end, n_tok in windows)
+    units.sort(key=lambda u: u[0])
+    if stats is not None:
+        stats["windows"] = stats.get("windows", 0) + len(units)
+        stats["long_notes"] = stats.get("long_notes", 0) + sum(1 for r in remaining if r > 1)
+
+    parts = [[] for _ in texts]
+    step = max(batch_size or 1, 1)
+    padded = real = 0
+    for start in range(0, len(units), step):
+        batch = units[start:start + step]
+        inputs = [texts[pos][cs:ce] if (cs, ce) != (0, len(texts[pos])) else texts[pos] for _, pos, cs, ce in batch]
+
+        call_start = time.perf_counter()
+        if batch_size is None or batch_size <= 1:
+            outputs = [nlp(inputs[0])]
+        else:
+            outputs = nlp(inputs, batch_size=batch_size)
+        # Model-call latency histogram in the run record (one sample per batch)
+        observe("ner_call_ms", 1000 * (time.perf_counter() - call_start))
+
+        padded += batch[-1][0] * len(batch)
+        real += sum(u[0] for u in batch)
+        if stats is not None:
+            stats["padding_fraction"] = round(1 - real / padded, 4) if padded else 0.0
+
+        done = []
+        for (_, pos, cs, _), entities in zip(batch, outputs):
+            parts[pos].append(_shift(entities, cs))
+            remaining[pos] -= 1
+            if remaining[pos] == 0:
+                done.append(pos)
+        if done:
+            yield done, [parts[p][0] if len(parts[p]) == 1 else merge_window_entities(parts[p]) for p in done]
+
+
+def run_ner_bucketed(nlp, texts, batch_size, layouts, stats=None) -> list:
+    """iter_ner_bucketed() collected back into one entity list per text, in input order."""
+    results = [None] * len(texts)
+    for positions, entities in iter_ner_bucketed(nlp, texts, batch_size, layouts, stats=stats):
+        for pos, ents in zip(positions, entities):
+            results[pos] = ents
+    return results
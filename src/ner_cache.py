@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ----------------------------
+# NER Result Cache
+# ----------------------------
+# Notes columns are very repetitive ("Net 30 Terms", "Delivered on time", ...),
+# so we keep the model's answer for every note text we have already scanned.
+# Key = sha256(model id + score threshold + note text), so changing the model
+# or the threshold never serves stale results.
+
+DEFAULT_CACHE_PATH = "data/cache/ner_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def make_cache_key(text: str, model_id: str, threshold: float) -> str:
+    payload = f"{model_id}\0{float(threshold)!r}\0{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def entities_to_json(entities) -> list:
+    """HF pipelines return numpy floats; keep only plain JSON types."""
+    clean = []
+    for ent in entities:
+        clean.append(
+            {
+                "entity_group": ent.get("entity_group"),
+                "score": float(ent.get("score", 0)),
+                "word": ent.get("word"),
+                "start": None if ent.get("start") is None else int(ent["start"]),
+                "end": None if ent.get("end") is None else int(ent["end"]),
+            }
+        )
+    return clean
+
+
+class NerCache:
+    """
+    On-disk (SQLite) cache of NER entities per note text, with LRU eviction.
+
+    - get_many(texts) -> {text: entities} for the hits only
+    - put_many({text: entities}) stores new results and trims to max_entries
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, model_id="", threshold=0.0, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.model_id = model_id
+        self.threshold = threshold
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._last_tick = 0.0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Streamlit reruns on different threads, so share one connection behind a lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ner_results ("
+            " key TEXT PRIMARY KEY,"
+            " entities TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ner_last_used ON ner_results(last_used)")
+        self._conn.commit()
+
+    def _tick(self):
+        """Strictly increasing 'last used' stamp so LRU order never ties within a process."""
+        self._last_tick = max(time.time(), self._last_tick + 1e-6)
+        return self._last_tick
+
+    def _key(self, text):
+        return make_cache_key(text, self.model_id, self.threshold)
+
+    def get_many(self, texts) -> dict:
+        found = {}
+        keys = {self._key(t): t for t in texts}
+        if not keys:
+            return found
+
+        now = self._tick()
+        key_list = list(keys)
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in slices.
+            for start in range(0, len(key_list), 500):
+                part = key_list[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, entities FROM ner_results WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, entities in rows:
+                    found[keys[key]] = json.loads(entities)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE ner_results SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows],
+                    )
+            self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, results: dict) -> None:
+        if not results:
+            return
+        now = self._tick()
+        rows = [(self._key(t), json.dumps(entities_to_json(ents)), now) for t, ents in results.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ner_results (key, entities, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drops the least-recently-used rows once we are over the size cap."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM ner_results").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM ner_results WHERE key IN ("
+                " SELECT key FROM ner_results ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM ner_results").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
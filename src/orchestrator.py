@@ -0,0 +1,282 @@
+import argparse
+import os
+import platform
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+# Allow `python src/orchestrator.py` as well as `from src import orchestrator`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import ai_auditor
+from src.data_generator import write_demo_dump
+from src.evidence import evidence_settings
+from src.ingest import load_table, ingest_cache_dir
+from src.findings_catalog import update_catalog
+from src.schema import INVOICE_SCHEMA
+from src.rule_engine import (
+    DEFAULT_CONFIG_PATH, DEFAULT_INVOICES_PATH, DEFAULT_MASTER_PATH, REPORT_DIR,
+    audit_and_export, load_config, vendor_index_path,
+)
+from src.telemetry import DEFAULT_RUN_LOG_DIR, span, recorder_from_config
+from src.vendor_index import VendorIndex
+
+# ----------------------------
+# Single-process audit pipeline
+# ----------------------------
+# run_audit.sh used to start one Python process per stage: each re-imported
+# pandas, re-read invoices.xlsx and re-parsed the config, and the AI scan only
+# started once the rules had finished. Here everything runs in one process:
+#
+#   generate -> load config + invoices + vendor index once
+#            -> rules + evidence export   } at the same time, on the same frame
+#            -> model load + NER scan     }
+#            -> findings catalog -> pytest -> summary
+#
+# The rules are cheap next to the model load and BERT releases the GIL during
+# inference, so the rule stage finishes while the model is still loading.
+#
+# Evidence files and run logs are the ones run_audit.sh produced: each stage's
+# console output is tee'd to run_logs/<NN>_<stage>_<ts>.log (while both run, the
+# console lines are prefixed with the stage so they can be told apart), plus one
+# JSON run record ("pipeline") with every stage's spans.
+
+STAGE_LOGS = {
+    "generate": "01_data_generator",
+    "rules": "02_rule_engine",
+    "ai": "03_ai_auditor",
+    "tests": "04_pytest",
+}
+
+
+class StageOutput:
+    """
+    Replaces sys.stdout while the pipeline runs: every thread's prints go to the
+    console, and to the log file of the stage that thread is running.
+
+    with output.stage("rules", path): ...   # prints on this thread -> path
+    """
+
+    def __init__(self, console):
+        self.console = console
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name, path, prefix=False):
+        with open(path, "w", encoding="utf-8") as log:
+            self._local.stage = (f"[{name}] " if prefix else "", log)
+            self._local.pending = ""
+            try:
+                yield log
+            finally:
+                self.flush()
+                self._local.stage = None
+
+    def write(self, text):
+        tag, log = getattr(self._local, "stage", None) or ("", None)
+        if log is None:
+            with self._lock:
+                return self.console.write(text)
+        # Whole lines only, so concurrent stages never interleave mid-line
+        pending = self._local.pending + text
+        lines, _, self._local.pending = pending.rpartition("\n")
+        if lines:
+            lines += "\n"
+            with self._lock:
+                log.write(lines)
+                self.console.write("".join(tag + line for line in lines.splitlines(True)))
+        return len(text)
+
+    def flush(self):
+        tag, log = getattr(self._local, "stage", None) or ("", None)
+        if log is not None and self._local.pending:
+            self.write("\n")
+        with self._lock:
+            self.console.flush()
+
+    def isatty(self):
+        return False
+
+
+def _rules_stage(invoices, master_list, config, recorder, lean):
+    with recorder.activate() if recorder else nullcontext():
+        return audit_and_export(invoices, master_list, config, lean=lean)
+
+
+def _ai_stage(invoices, config, recorder, options):
+    with recorder.activate() if recorder else nullcontext():
+        return ai_auditor.run_ai_audit(
+            invoices, options, cache=ai_auditor.cache_from_config(config), evidence=evidence_settings(config)
+        )
+
+
+def _run_stage(output, name, log_path, fn, *args, prefix=False):
+    """Runs one stage with its output tee'd to log_path; returns (result, error)."""
+    with output.stage(name, log_path, prefix=prefix):
+        try:
+            return fn(*args), None
+        except Exception as e:  # reported in the summary; the other stages still finish
+            print(f"❌ {name} stage failed: {type(e).__name__}: {e}")
+            return None, e
+
+
+def run_pipeline(
+    config_path=DEFAULT_CONFIG_PATH,
+    invoices_path=DEFAULT_INVOICES_PATH,
+    master_path=DEFAULT_MASTER_PATH,
+    generate=True,
+    with_ai=True,
+    run_tests=True,
+    lean=False,
+    log_dir=None,
+):
+    """
+    The whole demo run (what run_audit.sh does) in one process.
+    Returns {"timestamp", "logs": {stage: path}, "results", "ai_findings",
+    "errors": {stage: exception}, "tests_returncode", "run_record"}.
+    """
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    config = load_config(config_path)
+    log_dir = log_dir or (config.get("telemetry_settings", {}) or {}).get("run_log_dir") or DEFAULT_RUN_LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    logs = {stage: os.path.join(log_dir, f"{prefix}_{ts}.log") for stage, prefix in STAGE_LOGS.items()}
+    outcome = {"timestamp": ts, "logs": {}, "results": None, "ai_findings": None, "errors": {},
+               "tests_returncode": None, "run_record": None}
+
+    print("=" * 60)
+    print("🚀 Procurement Audit Automation - FULL DEMO RUN (single process)")
+    print(f"Timestamp: {ts}")
+    print(f"Python {platform.python_version()} ({sys.executable})")
+    print("=" * 60)
+
+    output = StageOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        # 1) Generate dirty data
+        if generate:
+            print("\n1) 🧬 Generating dirty ERP data...")
+            _, error = _run_stage(output, "generate", logs["generate"], write_demo_dump)
+            outcome["logs"]["generate"] = logs["generate"]
+            if error is not None:
+                outcome["errors"]["generate"] = error
+                return outcome
+
+        # 2) Load the dump once; both stages share these objects (and the config above)
+        recorder = recorder_from_config("pipeline", config)
+        with recorder.activate() if recorder else nullcontext():
+            try:
+                with span("ingest") as s:
+                    invoices = load_table(invoices_path, cache_dir=ingest_cache_dir(config), schema=INVOICE_SCHEMA)
+                    master_list = VendorIndex.load_or_build(master_path, vendor_index_path(config))
+                    s.rows = len(invoices)
+            except FileNotFoundError as e:
+                print(f"❌ Error: {e}. Run 'src/data_generator.py' first to generate data.")
+                outcome["errors"]["ingest"] = e
+                return outcome
+        print(f"\n📥 Loaded {len(invoices)} invoices and {len(master_list)} vendors once for every stage")
+
+        # 3) Rules and the FOIP/PII scan at the same time
+        stages = {"rules": (_rules_stage, invoices, master_list, config, recorder, lean)}
+        if with_ai:
+            stages["ai"] = (_ai_stage, invoices, config, recorder, ai_auditor.scan_options_from_config(config))
+            print("2) ⚙️  Rule Engine + 3) 🤖 AI Auditor (running concurrently)...")
+        else:
+            print("2) ⚙️  Rule Engine...")
+            print("⏭️  Skipping AI auditor (--skip-ai)")
+        with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as pool:
+            futures = {
+                name: pool.submit(_run_stage, output, name, logs[name], *job, prefix=len(stages) > 1)
+                for name, job in stages.items()
+            }
+            for name, future in futures.items():
+                result, error = future.result()
+                outcome["logs"][name] = logs[name]
+                if error is not None:
+                    outcome["errors"][name] = error
+                elif name == "rules":
+                    outcome["results"] = result
+                else:
+                    outcome["ai_findings"] = result
+
+        # Both stages have finished: the catalog ingests the rule evidence and the
+        # AI stage's foip_ai_findings_<ts> files (written by run_ai_audit)
+        if outcome["results"] is not None:
+            with recorder.activate() if recorder else nullcontext():
+                with span("catalog"):
+                    catalog = update_catalog(REPORT_DIR, config)
+            if catalog is not None:
+                print(f"\n🗂️  Findings catalog: +{catalog} findings")
+
+        if recorder is not None:
+            recorder.meta.update({"mode": "lean" if lean else "full", "with_ai": with_ai,
+                                  "stage_logs": outcome["logs"]})
+            outcome["run_record"] = recorder.save()
+
+        # 4) Tests (a separate interpreter, like `pytest -q` in the shell script)
+        if run_tests and not outcome["errors"]:
+            print("\n4) ✅ Running Unit Tests (pytest)...")
+            with output.stage("tests", logs["tests"]):
+                proc = subprocess.run(
+                    [sys.executable, "-m", "pytest", "-q"], cwd=str(ROOT),
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                )
+                print(proc.stdout, end="")
+            outcome["logs"]["tests"] = logs["tests"]
+            outcome["tests_returncode"] = proc.returncode
+    finally:
+        sys.stdout = output.console
+
+    _print_summary(outcome, invoices_path, master_path)
+    return outcome
+
+
+def _print_summary(outcome, invoices_path, master_path):
+    failed = bool(outcome["errors"]) or outcome["tests_returncode"] not in (None, 0)
+    print("\n" + "=" * 60)
+    print("❌ DEMO RUN FAILED" if failed else "✅ FULL DEMO COMPLETE")
+    print("=" * 60)
+    for stage, error in outcome["errors"].items():
+        print(f"   {stage}: {type(error).__name__}: {error}")
+    print("\n📌 Evidence files:")
+    print(f"  Raw inputs:\n   - {invoices_path}\n   - {master_path}")
+    print("  Reports:")
+    results = outcome["results"]
+    if results is not None:
+        paths = results.export_paths if hasattr(results, "export_paths") else results["export_paths"]
+        for path in paths.values():
+            print(f"   - {path}")
+    if outcome["ai_findings"] is not None and not outcome["ai_findings"].empty:
+        print(f"   - {ai_auditor.AI_FINDINGS_PATH}")
+    else:
+        print("   - (No ai_risk_findings.csv written — AI auditor skipped or found 0 items)")
+    print("  Run logs:")
+    for path in outcome["logs"].values():
+        print(f"   - {path}")
+    if outcome["run_record"]:
+        print(f"   - {outcome['run_record']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full audit demo (generate, rules + AI, tests) in one process.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--invoices", default=DEFAULT_INVOICES_PATH)
+    parser.add_argument("--master", default=DEFAULT_MASTER_PATH)
+    parser.add_argument("--no-generate", action="store_true", help="Audit the existing dump instead of generating one.")
+    parser.add_argument("--skip-ai", action="store_true", help="Rules only (no model load / FOIP scan).")
+    parser.add_argument("--skip-tests", action="store_true", help="Do not run pytest at the end.")
+    parser.add_argument("--lean", action="store_true", help="Rule stage keeps masks instead of row copies.")
+    args = parser.parse_args()
+
+    outcome = run_pipeline(
+        args.config, args.invoices, args.master,
+        generate=not args.no_generate, with_ai=not args.skip_ai, run_tests=not args.skip_tests, lean=args.lean,
+    )
+    sys.exit(1 if outcome["errors"] or outcome["tests_returncode"] not in (None, 0) else 0)
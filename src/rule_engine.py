@@ -1,7 +1,32 @@
+import argparse
 import os
+import sys
 import yaml
+import numpy as np
 import pandas as pd
+from contextlib import nullcontext
 from datetime import datetime
+from pathlib import Path
+
+# Allow `python src/rule_engine.py` as well as `from src.rule_engine import ...`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.ingest import load_table, ingest_cache_dir
+from src.schema import INVOICE_SCHEMA
+from src.vendor_index import VendorIndex, as_vendor_index, DEFAULT_INDEX_PATH, DEFAULT_MIN_SIMILARITY
+from src.rules import RULES, AuditContext, compile_plan
+from src.telemetry import span, recorder_from_config, parse_profile_args
+from src.findings_catalog import update_catalog
+from src.evidence import (
+    DEFAULT_FORMATS, DEFAULT_WORKERS, evidence_settings, manifest_entry, write_evidence_pack, write_manifest,
+)
+
+DEFAULT_INVOICES_PATH = "data/raw_erp_dump/invoices.xlsx"
+DEFAULT_MASTER_PATH = "data/raw_erp_dump/vendor_master.csv"
+DEFAULT_CONFIG_PATH = "config/audit_rules.yaml"
+REPORT_DIR = "data/audit_reports"
 
 
 def load_config(config_path="config/audit_rules.yaml"):
@@ -13,67 +38,424 @@ def load_config(config_path="config/audit_rules.yaml"):
         return yaml.safe_load(f) or {}
 
 
+def vendor_index_path(config: dict):
+    """ingest_settings.vendor_index_path (None/empty = rebuild the index every run)."""
+    ingest = config.get("ingest_settings", {}) or {}
+    return ingest.get("vendor_index_path", DEFAULT_INDEX_PATH) or None
+
+
+def closest_vendor_settings(config: dict) -> dict:
+    """risk_settings.closest_vendor_match / closest_vendor_min_similarity."""
+    risk = config.get("risk_settings", {}) or {}
+    return {
+        "enabled": bool(risk.get("closest_vendor_match", True)),
+        "min_similarity": float(risk.get("closest_vendor_min_similarity", DEFAULT_MIN_SIMILARITY)),
+    }
+
+
 # -----------------------------
 # : Pure Audit Engine
 # -----------------------------
-def audit_invoices(invoices: pd.DataFrame, master_list: pd.DataFrame, config: dict) -> dict:
+class LeanAuditResult:
     """
-    Pure function (no file IO, no prints):
-    Takes DataFrames + config, returns structured results.
+    Zero-copy audit result: holds a reference to the input frame plus one
+    boolean mask per check, instead of copies of the offending rows.
+    Masks come from the compiled rule plan (src/rules.py); shared columns
+    such as Variance are computed once, on first use.
+
+    - mask(name) / rows(name) / count(name): what each check found
+    - variance: the Variance column, computed on first use
+    - materialize(name, columns=None, limit=None): build only the rows you need
+    - to_csv(name, path): export a check in slices (never the full frame at once)
+    - result["ghosts"] / result["failures"] still work, for dict-style callers
     """
-    financial = config.get("financial_limits", {})
-    limit = float(financial.get("max_po_variance", 0.10))
 
-    inv = invoices.copy()
-    master = master_list.copy()
+    def __init__(self, invoices: pd.DataFrame, vendors, config: dict, plan=None):
+        self.invoices = invoices
+        self.vendors = vendors
+        self.plan = plan or compile_plan(config)
+        self.ctx = AuditContext(invoices, vendors, config)
+        self.limit = float(config.get("financial_limits", {}).get("max_po_variance", 0.10))
+        # Ghost findings name the closest legitimate vendor (n-gram index, see src/vendor_index.py)
+        self.closest_vendor = closest_vendor_settings(config)
+        self._masks = {}
+        self.export_paths = None
+
+    @property
+    def checks(self):
+        return [rule.result_key for rule in self.plan.rules]
+
+    @property
+    def variance(self) -> pd.Series:
+        return self.ctx.get("variance")
+
+    def mask(self, name) -> np.ndarray:
+        if name not in self._masks:
+            if name not in {rule.result_key for rule in RULES.values()}:
+                raise KeyError(name)
+            self._masks[name] = self.plan.evaluate_rule(self.ctx, name)
+        return self._masks[name]
 
-    # ---- CHECK 1: Ghost Vendors (Anti-Join) ----
-    merged = inv.merge(master, on="VendorID", how="left", indicator=True)
-    ghosts = merged[merged["_merge"] == "left_only"].copy()
+    def evaluate_all(self) -> dict:
+        """Every enabled rule in one pass over the shared intermediates."""
+        for name in self.plan.intermediates:
+            self.ctx.get(name)
+        return {name: self.mask(name) for name in self.checks}
 
-    # ---- CHECK 2: PO variance ----
-    inv["InvoiceAmount"] = pd.to_numeric(inv.get("InvoiceAmount"), errors="coerce")
-    inv["PO_Amount"] = pd.to_numeric(inv.get("PO_Amount"), errors="coerce")
+    def rows(self, name) -> np.ndarray:
+        return np.flatnonzero(self.mask(name))
 
-    # Avoid divide-by-zero
-    denom = inv["PO_Amount"].replace({0: pd.NA})
-    inv["Variance"] = (inv["InvoiceAmount"] - inv["PO_Amount"]).abs() / denom
+    def count(self, name) -> int:
+        return int(self.mask(name).sum())
 
-    failures = inv[inv["Variance"] > limit].copy()
+    def materialize(self, name, columns=None, limit=None, positions=None) -> pd.DataFrame:
+        idx = self.rows(name) if positions is None else positions
+        if limit is not None:
+            idx = idx[:limit]
+        out = self.invoices.iloc[idx]
+        if columns is not None:
+            out = out[[c for c in columns if c in out.columns]]
+        out = out.copy()
+        # Checks that work on amounts report the numeric (coerced) values
+        if name in ("failures", "high_value", "duplicates"):
+            for col, key in (("InvoiceAmount", "invoice_amount"), ("PO_Amount", "po_amount")):
+                if col in out.columns:
+                    out[col] = self.ctx.get(key).iloc[idx].to_numpy()
+        if name == "failures" and (columns is None or "Variance" in columns):
+            out["Variance"] = self.variance.iloc[idx].to_numpy()
+        if name == "duplicates" and len(idx):
+            original, kind = self.ctx.get("duplicate_match")
+            ids = self.invoices["InvoiceID"].to_numpy() if "InvoiceID" in self.invoices.columns else original
+            out["DuplicateOf"] = ids[original[idx]]
+            out["DuplicateType"] = kind[idx]
+        elif name == "duplicates":
+            out["DuplicateOf"], out["DuplicateType"] = pd.Series(dtype=object), pd.Series(dtype=object)
+        if name == "ghosts" and self.closest_vendor["enabled"] and (columns is None or "ClosestVendor" in columns):
+            rows = self.invoices.iloc[idx]
+            closest = self.vendors.closest(
+                rows["VendorID"], rows["VendorName"] if "VendorName" in rows.columns else None,
+                min_similarity=self.closest_vendor["min_similarity"],
+            )
+            out["ClosestVendor"] = closest["ClosestVendor"].to_numpy()
+            out["VendorSimilarity"] = closest["VendorSimilarity"].to_numpy()
+        return out
+
+    def iter_slices(self, name, slice_rows=100_000):
+        """Flagged rows of one check as DataFrames of at most slice_rows (always at least one)."""
+        idx = self.rows(name)
+        if len(idx) == 0:
+            yield self.materialize(name)
+        for start in range(0, len(idx), slice_rows):
+            yield self.materialize(name, positions=idx[start:start + slice_rows])
+
+    def to_csv(self, name, path, slice_rows=100_000) -> str:
+        for i, part in enumerate(self.iter_slices(name, slice_rows)):
+            part.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        return path
+
+    def __getitem__(self, key):
+        if key in ("limit", "export_paths"):
+            return getattr(self, key)
+        return self.materialize(key)
+
+    def __contains__(self, key):
+        return key in ("limit", "export_paths") or key in self.checks
+
+
+def audit_invoices(invoices: pd.DataFrame, master_list, config: dict, lean=False):
+    """
+    Pure function (no file IO, no prints):
+    Takes DataFrames + config, returns structured results.
+
+    Rules come from the compiled plan (rules.enabled in the config):
+    ghosts, failures (PO variance), high_value, duplicates (with DuplicateOf /
+    DuplicateType). Disabled rules return no rows.
+
+    master_list can be the vendor master DataFrame or a prebuilt VendorIndex.
+    lean=True returns a LeanAuditResult (masks + lazy Variance, no row copies).
+    """
+    result = LeanAuditResult(invoices, as_vendor_index(master_list), config)
+    if lean:
+        return result
+
+    # One pass: shared intermediates once, then every enabled rule
+    result.evaluate_all()
+
+    inv = invoices.copy()
+    inv["InvoiceAmount"] = result.ctx.get("invoice_amount")
+    inv["PO_Amount"] = result.ctx.get("po_amount")
+    inv["Variance"] = result.variance
 
     return {
-        "limit": limit,
-        "ghosts": ghosts,
-        "failures": failures,
-        "merged": merged,
+        "limit": result.limit,
+        "rules": result.checks,
+        "ghosts": result.materialize("ghosts"),
+        "failures": inv[result.mask("failures")].copy(),
+        "high_value": inv[result.mask("high_value")].copy(),
+        "duplicates": result.materialize("duplicates"),
         "invoices_with_variance": inv,
     }
 
 
-def export_findings(ghosts: pd.DataFrame, failures: pd.DataFrame, out_dir="data/audit_reports") -> dict:
-    """
-    Writes evidence CSVs so your CLI run produces audit artifacts.
-    Returns paths for logging / demo proof.
-    """
+def evidence_paths(out_dir=REPORT_DIR, with_ai=False) -> dict:
+    """Timestamped evidence file names for one run (creates out_dir)."""
     os.makedirs(out_dir, exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = {
+        "ghosts_csv": os.path.join(out_dir, f"ghost_vendors_{ts}.csv"),
+        "variance_csv": os.path.join(out_dir, f"po_variance_{ts}.csv"),
+        "high_value_csv": os.path.join(out_dir, f"high_value_{ts}.csv"),
+    }
+    if with_ai:
+        paths["ai_csv"] = os.path.join(out_dir, f"foip_ai_findings_{ts}.csv")
+    paths["manifest"] = os.path.join(out_dir, f"evidence_manifest_{ts}.json")
+    return paths
+
+
+# Evidence table name -> key prefix in the paths dict (ghosts_csv, variance_parquet, ...)
+EVIDENCE_KEYS = {
+    "ghost_vendors": "ghosts",
+    "po_variance": "variance",
+    "high_value": "high_value",
+    "duplicate_invoices": "duplicates",
+    "foip_ai_findings": "ai",
+}
 
-    ghost_path = os.path.join(out_dir, f"ghost_vendors_{ts}.csv")
-    variance_path = os.path.join(out_dir, f"po_variance_{ts}.csv")
 
-    ghosts.to_csv(ghost_path, index=False)
-    failures.to_csv(variance_path, index=False)
+def export_findings(
+    ghosts, failures=None, out_dir=REPORT_DIR, ai_findings=None, formats=DEFAULT_FORMATS, workers=DEFAULT_WORKERS,
+    duplicates=None, high_value=None,
+) -> dict:
+    """
+    Writes the evidence pack so your CLI run produces audit artifacts.
+    Returns paths for logging / demo proof: "<check>_<format>" per file
+    (ghosts_csv, variance_parquet, ai_zip, ...) plus "manifest".
+
+    Pass either the two finding DataFrames, or a single LeanAuditResult
+    (rows are then materialized slice by slice while writing).
+    ai_findings (FOIP/PII scan output), high_value and duplicates (taken from
+    the LeanAuditResult when their rules are enabled) are written alongside
+    when given.
+    formats: any of csv / parquet / zip (see src/evidence.py); all tables and
+    formats are written concurrently and listed with SHA-256s in the manifest.
+    """
+    if isinstance(ghosts, LeanAuditResult):
+        lean = ghosts
+        tables = {
+            "ghost_vendors": lambda: lean.iter_slices("ghosts"),
+            "po_variance": lambda: lean.iter_slices("failures"),
+        }
+        if lean.plan.is_enabled("high_value"):
+            tables["high_value"] = lambda: lean.iter_slices("high_value")
+        if lean.plan.is_enabled("duplicates"):
+            tables["duplicate_invoices"] = lambda: lean.iter_slices("duplicates")
+    else:
+        tables = {"ghost_vendors": ghosts, "po_variance": failures}
+        if high_value is not None:
+            tables["high_value"] = high_value
+        if duplicates is not None:
+            tables["duplicate_invoices"] = duplicates
+    if ai_findings is not None:
+        tables["foip_ai_findings"] = ai_findings
 
-    return {"ghosts_csv": ghost_path, "variance_csv": variance_path}
+    with span("export", formats=list(formats)) as s:
+        pack = write_evidence_pack(tables, out_dir, formats=formats, workers=workers)
+        s.rows = sum(e["rows"] for e in pack["entries"])
+
+    paths = {f"{EVIDENCE_KEYS[name]}_{fmt}": path for (name, fmt), path in pack["files"].items()}
+    paths["manifest"] = pack["manifest"]
+    return paths
+
+
+def print_findings(limit, ghost_count, ghosts_head, failure_count, failures_head) -> None:
+    """Console summary shared by the in-memory, lean and streaming runs."""
+    if ghost_count:
+        print(f"🚨 ALERT: Found {ghost_count} Ghost Vendors!")
+        cols = [c for c in ["InvoiceID", "VendorID", "VendorName", "ClosestVendor", "VendorSimilarity"]
+                if c in ghosts_head.columns]
+        print(ghosts_head[cols].head(10))
+    else:
+        print("✅ Vendor Compliance Check Passed.")
+
+    if failure_count:
+        print(f"⚠️  WARNING: Found {failure_count} Budget Variances > {limit*100:.0f}%")
+        cols = [c for c in ["InvoiceID", "InvoiceAmount", "PO_Amount", "Variance"] if c in failures_head.columns]
+        print(failures_head[cols].head(10))
+    else:
+        print("✅ Financial Logic Check Passed.")
+
+
+def print_duplicates(count, head) -> None:
+    if count:
+        print(f"🔁 WARNING: Found {count} possible duplicate invoices!")
+        cols = [c for c in ["InvoiceID", "VendorID", "InvoiceAmount", "DuplicateOf", "DuplicateType"] if c in head.columns]
+        print(head[cols].head(10))
+    else:
+        print("✅ Duplicate Invoice Check Passed.")
+
+
+# -----------------------------
+# Streaming (chunked) audit for multi-GB exports
+# -----------------------------
+def iter_invoice_chunks(invoices_path, chunksize=100_000):
+    """
+    Yields the invoice dump as DataFrames of at most `chunksize` rows.
+    CSV uses pandas' chunked reader; .xlsx is walked row by row with
+    openpyxl's read-only mode, so the workbook is never fully in memory.
+    """
+    if str(invoices_path).lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(invoices_path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(c) for c in next(rows, ())]
+            buffer = []
+            for values in rows:
+                if all(v is None for v in values):
+                    continue
+                buffer.append(values)
+                if len(buffer) >= chunksize:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            wb.close()
+    else:
+        yield from pd.read_csv(invoices_path, chunksize=chunksize)
+
+
+def _append_csv(df: pd.DataFrame, path: str, started: set) -> None:
+    """
+    Appends rows to an evidence CSV. The first write of this run truncates
+    the file and writes the header; `started` tracks which files we own.
+    """
+    first = path not in started
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+    started.add(path)
+
+
+def run_streaming_audit(
+    invoices_path=DEFAULT_INVOICES_PATH,
+    master_path=DEFAULT_MASTER_PATH,
+    config_path=DEFAULT_CONFIG_PATH,
+    chunksize=100_000,
+    out_dir=REPORT_DIR,
+):
+    """
+    Memory-flat version of run_audit_checks:
+    - vendor master is loaded once as a (saved) VendorIndex
+    - invoices are read in fixed-size chunks
+    - ghost vendor, PO variance and high value checks run per chunk (the duplicate invoice
+      check compares rows across the whole dump, so it only runs in the
+      whole-file modes)
+    - findings are appended to the evidence CSVs as we go
+    Only counts and the first few findings (for printing) are kept in memory.
+    """
+    config = load_config(config_path)
+    limit = float(config.get("financial_limits", {}).get("max_po_variance", 0.10))
+
+    if not (os.path.exists(invoices_path) and os.path.exists(master_path)):
+        print("❌ Error: Run 'src/data_generator.py' first to generate data.")
+        return None
+
+    vendors = VendorIndex.load_or_build(master_path, vendor_index_path(config))
+    plan = compile_plan(config)
+    paths = evidence_paths(out_dir)
+    if not plan.is_enabled("high_value"):
+        del paths["high_value_csv"]
+
+    print(f"🔍 Streaming Audit Started. Using Variance Limit: {limit * 100:.0f}% (chunks of {chunksize} rows)")
+
+    rows = ghost_count = failure_count = high_value_count = 0
+    ghost_sample, failure_sample = [], []
+    columns = []
+    started = set()
+    chunks = iter_invoice_chunks(invoices_path, chunksize)
+    while True:
+        # One ingest/rules/export span per chunk (the run record sums them per stage)
+        with span("ingest") as s:
+            chunk = next(chunks, None)
+            s.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        rows += len(chunk)
+        columns = list(chunk.columns)
+
+        with span("rules", rows=len(chunk)):
+            result = LeanAuditResult(chunk, vendors, config, plan=plan)
+            ghosts = result.materialize("ghosts")
+            failures = result.materialize("failures")
+            high_value = result.materialize("high_value") if "high_value_csv" in paths else pd.DataFrame()
+
+        with span("export", rows=len(ghosts) + len(failures) + len(high_value)):
+            if not ghosts.empty:
+                _append_csv(ghosts, paths["ghosts_csv"], started)
+                ghost_count += len(ghosts)
+                if sum(map(len, ghost_sample)) < 10:
+                    ghost_sample.append(ghosts.head(10))
+            if not failures.empty:
+                _append_csv(failures, paths["variance_csv"], started)
+                failure_count += len(failures)
+                if sum(map(len, failure_sample)) < 10:
+                    failure_sample.append(failures.head(10))
+            if not high_value.empty:
+                _append_csv(high_value, paths["high_value_csv"], started)
+                high_value_count += len(high_value)
+
+    # Keep the evidence pack complete even when a check found nothing
+    if paths["ghosts_csv"] not in started:
+        closest = ["ClosestVendor", "VendorSimilarity"] if closest_vendor_settings(config)["enabled"] else []
+        pd.DataFrame(columns=columns + closest).to_csv(paths["ghosts_csv"], index=False)
+    if paths["variance_csv"] not in started:
+        pd.DataFrame(columns=columns + ["Variance"]).to_csv(paths["variance_csv"], index=False)
+    if "high_value_csv" in paths and paths["high_value_csv"] not in started:
+        pd.DataFrame(columns=columns).to_csv(paths["high_value_csv"], index=False)
+
+    # Appended chunk by chunk, so the CSVs are checksummed once they are complete
+    entries = [
+        manifest_entry("ghost_vendors", paths["ghosts_csv"], ghost_count),
+        manifest_entry("po_variance", paths["variance_csv"], failure_count),
+    ]
+    if "high_value_csv" in paths:
+        entries.append(manifest_entry("high_value", paths["high_value_csv"], high_value_count))
+    write_manifest(entries, paths["manifest"])
+
+    ghosts = pd.concat(ghost_sample).head(10) if ghost_sample else pd.DataFrame()
+    failures = pd.concat(failure_sample).head(10) if failure_sample else pd.DataFrame()
+
+    print(f"   Rows audited: {rows}")
+    print_findings(limit, ghost_count, ghosts, failure_count, failures)
+
+    print("\n📄 Evidence exports saved:")
+    for path in paths.values():
+        print(f"   - {path}")
+
+    return {
+        "limit": limit,
+        "rows": rows,
+        "ghost_count": ghost_count,
+        "failure_count": failure_count,
+        "high_value_count": high_value_count,
+        "ghosts": ghosts,
+        "failures": failures,
+        "export_paths": paths,
+    }
 
 
 # -----------------------------
 # Backwards-compatible CLI runner
 # -----------------------------
 def run_audit_checks(
-    invoices_path="data/raw_erp_dump/invoices.xlsx",
-    master_path="data/raw_erp_dump/vendor_master.csv",
-    config_path="config/audit_rules.yaml",
+    invoices_path=DEFAULT_INVOICES_PATH,
+    master_path=DEFAULT_MASTER_PATH,
+    config_path=DEFAULT_CONFIG_PATH,
+    chunksize=None,
+    lean=False,
+    incremental=False,
+    with_ai=False,
+    profile=None,
 ):
     """
     CLI Orchestrator:
@@ -82,47 +464,173 @@ def run_audit_checks(
     - prints output
     - exports evidence CSVs
     - returns results dict
+
+    chunksize: stream the invoices in chunks of this many rows instead of
+    loading the whole dump (see run_streaming_audit).
+    lean: keep masks instead of row copies (see LeanAuditResult); the
+    returned object materializes rows on demand.
+    incremental: only re-check rows that are new/changed since the last run,
+    using the state store at incremental_settings.state_path (see src/incremental.py);
+    with_ai adds the FOIP/PII scan to that delta run.
+    profile: {stage: "cprofile" | "tracemalloc"} hooks for the run record (see src/telemetry.py).
+
+    Stage timings (ingest, each rule, export, ...) are written as a JSON run
+    record to telemetry_settings.run_log_dir unless run_records is false.
+    The new evidence files are then ingested into the findings catalog
+    (catalog_settings, see src/findings_catalog.py).
     """
     config = load_config(config_path)
+    recorder = recorder_from_config("rule_engine", config, profile=profile)
+
+    with recorder.activate() if recorder else nullcontext():
+        if chunksize:
+            results = run_streaming_audit(invoices_path, master_path, config_path, chunksize=chunksize)
+        else:
+            results = _run_audit(invoices_path, master_path, config, lean, incremental, with_ai)
+
+        if results is not None:
+            with span("catalog"):
+                catalog = update_catalog(REPORT_DIR, config)
+            if catalog is not None:
+                print(f"\n🗂️  Findings catalog: +{catalog} findings")
+
+    if recorder is not None:
+        recorder.meta.update({"mode": "streaming" if chunksize else "incremental" if incremental else
+                              "lean" if lean else "full", "with_ai": with_ai})
+        print(f"\n🧾 Run record: {recorder.save()}")
+    return results
+
 
+def _run_audit(invoices_path, master_path, config, lean, incremental, with_ai):
+    """Whole-file audit (full / lean / incremental) for run_audit_checks."""
     try:
-        invoices = pd.read_excel(invoices_path)
-        master_list = pd.read_csv(master_path)
+        # Columnar cache: the workbook is only parsed when it changed
+        with span("ingest") as s:
+            invoices = load_table(invoices_path, cache_dir=ingest_cache_dir(config), schema=INVOICE_SCHEMA)
+            master_list = VendorIndex.load_or_build(master_path, vendor_index_path(config))
+            s.rows = len(invoices)
     except FileNotFoundError:
         print("❌ Error: Run 'src/data_generator.py' first to generate data.")
         return None
 
-    results = audit_invoices(invoices, master_list, config)
+    if incremental:
+        return _run_incremental(invoices, master_list, config, with_ai)
+    return audit_and_export(invoices, master_list, config, lean=lean)
+
+
+def audit_and_export(invoices, master_list, config, lean=False):
+    """
+    Rules -> console summary -> evidence pack, on frames that are already loaded
+    (the CLI run above, and the single-process pipeline in src/orchestrator.py).
+    """
+    with span("rules", rows=len(invoices)):
+        results = audit_invoices(invoices, master_list, config, lean=lean)
     limit = results["limit"]
-    ghosts = results["ghosts"]
-    failures = results["failures"]
 
     print(f"🔍 Audit Started. Using Variance Limit: {limit * 100:.0f}%")
 
-    if not ghosts.empty:
-        print(f"🚨 ALERT: Found {len(ghosts)} Ghost Vendors!")
-        cols = [c for c in ["InvoiceID", "VendorID", "VendorName"] if c in ghosts.columns]
-        print(ghosts[cols].head(10))
+    # Export evidence pack
+    if lean:
+        print_findings(
+            limit,
+            results.count("ghosts"), results.materialize("ghosts", limit=10),
+            results.count("failures"), results.materialize("failures", limit=10),
+        )
+        if results.plan.is_enabled("duplicates"):
+            print_duplicates(results.count("duplicates"), results.materialize("duplicates", limit=10))
+        paths = export_findings(results, **evidence_settings(config))
+        results.export_paths = paths
     else:
-        print("✅ Vendor Compliance Check Passed.")
+        ghosts = results["ghosts"]
+        failures = results["failures"]
+        print_findings(limit, len(ghosts), ghosts, len(failures), failures)
+        high_value = results["high_value"] if "high_value" in results["rules"] else None
+        duplicates = results["duplicates"] if "duplicates" in results["rules"] else None
+        if duplicates is not None:
+            print_duplicates(len(duplicates), duplicates)
+        paths = export_findings(
+            ghosts, failures, duplicates=duplicates, high_value=high_value, **evidence_settings(config)
+        )
+        results["export_paths"] = paths
 
-    if not failures.empty:
-        print(f"⚠️  WARNING: Found {len(failures)} Budget Variances > {limit*100:.0f}%")
-        cols = [c for c in ["InvoiceID", "InvoiceAmount", "PO_Amount", "Variance"] if c in failures.columns]
-        print(failures[cols].head(10))
-    else:
-        print("✅ Financial Logic Check Passed.")
+    print("\n📄 Evidence exports saved:")
+    for path in paths.values():
+        print(f"   - {path}")
 
-    # Export evidence pack
-    paths = export_findings(ghosts, failures)
+    return results
+
+
+def _run_incremental(invoices, master_list, config, with_ai):
+    """CLI side of the delta audit: open the state store, run, print, export."""
+    # Imported here: src.incremental / src.ai_auditor both import this module.
+    from src.incremental import AuditStateStore, audit_incremental, DEFAULT_STATE_PATH
+
+    state_path = (config.get("incremental_settings", {}) or {}).get("state_path") or DEFAULT_STATE_PATH
+    store = AuditStateStore(state_path)
+
+    ai_scan = ai_settings = None
+    if with_ai:
+        from src import ai_auditor
+
+        options = ai_auditor.scan_options_from_config(config)
+        cache = ai_auditor.cache_from_config(config)
+        ai_scan = lambda df: ai_auditor.scan_notes_for_risk(df, cache=cache, **options)
+        ai_settings = {
+            "model": ai_auditor.model_tag(options["backend"]),
+            "threshold": ai_auditor.PER_SCORE_THRESHOLD,
+            "prefilter": options["prefilter"],
+        }
+
+    try:
+        results = audit_incremental(invoices, master_list, config, store, ai_scan=ai_scan, ai_settings=ai_settings)
+    finally:
+        store.close()
+
+    stats = results["stats"]
+    limit = results["limit"]
+    print(f"🔍 Incremental Audit Started. Using Variance Limit: {limit * 100:.0f}%")
+    print(f"   {stats['new_or_changed']} of {stats['rows']} rows new/changed -> "
+          f"{stats['rule_rows_checked']} rule-checked, {stats['ai_rows_scanned']} AI-scanned")
+
+    ghosts, failures = results["ghosts"], results["failures"]
+    print_findings(limit, len(ghosts), ghosts, len(failures), failures)
+    high_value = results["high_value"] if "high_value" in results["rules"] else None
+    duplicates = results["duplicates"] if "duplicates" in results["rules"] else None
+    if duplicates is not None:
+        print_duplicates(len(duplicates), duplicates)
+
+    paths = export_findings(
+        ghosts, failures, ai_findings=results["ai_findings"] if with_ai else None,
+        duplicates=duplicates, high_value=high_value, **evidence_settings(config)
+    )
     results["export_paths"] = paths
 
     print("\n📄 Evidence exports saved:")
-    print(f"   - {paths['ghosts_csv']}")
-    print(f"   - {paths['variance_csv']}")
-
+    for path in paths.values():
+        print(f"   - {path}")
     return results
 
 
 if __name__ == "__main__":
-    run_audit_checks()
+    parser = argparse.ArgumentParser(description="Run the rule checks over an ERP invoice dump.")
+    parser.add_argument("--invoices", default=DEFAULT_INVOICES_PATH)
+    parser.add_argument("--master", default=DEFAULT_MASTER_PATH)
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the invoices in chunks of N rows (flat memory for huge dumps).")
+    parser.add_argument("--lean", action="store_true",
+                        help="Keep per-check masks instead of row copies; rows are built only for export.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-check rows that are new/changed since the last run (state in data/cache/).")
+    parser.add_argument("--with-ai", action="store_true",
+                        help="With --incremental: also run the FOIP/PII scan on the new/changed rows.")
+    parser.add_argument("--profile", nargs="*", default=[], metavar="STAGE[:MODE]",
+                        help="Profile stages in the run record, e.g. rules rule:po_variance:tracemalloc "
+                             "(MODE = cprofile (default) | tracemalloc; '*' = every stage).")
+    args = parser.parse_args()
+
+    run_audit_checks(
+        args.invoices, args.master, args.config,
+        chunksize=args.chunksize, lean=args.lean, incremental=args.incremental, with_ai=args.with_ai,
+        profile=parse_profile_args(args.profile),
+    )
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from src.duplicates import duplicate_settings, find_duplicates
+from src.schema import as_datetime, as_numeric
+from src.telemetry import span
+
+# ----------------------------
+# Rule Registry + Execution Plan
+# ----------------------------
+# Every audit rule is declared once here and switched on/off from
+# config/audit_rules.yaml. compile_plan() turns the config into a plan:
+# the list of enabled rules plus the shared intermediates they need
+# (numeric amounts, Variance, vendor membership). Evaluating the plan
+# computes each intermediate once and every rule is a vectorized
+# expression over those columns, so adding a rule never adds another
+# copy or scan of the invoice frame.
+#
+# Adding a rule:
+#
+#   @register_rule("my_rule", result_key="my_findings", needs=("invoice_amount",))
+#   def my_rule(ctx, config):
+#       return (ctx.get("invoice_amount") > 1_000_000).to_numpy()
+
+RULES = {}
+INTERMEDIATES = {}
+
+DEFAULT_ENABLED_RULES = ("ghost_vendors", "po_variance", "high_value", "duplicate_invoices")
+
+
+class Rule:
+    def __init__(self, name, fn, result_key, needs=(), enabled_by=None):
+        self.name = name
+        self.fn = fn
+        self.result_key = result_key
+        self.needs = tuple(needs)
+        # Optional extra switch (section, key) kept for older config files
+        self.enabled_by = enabled_by
+
+    def is_enabled(self, config: dict) -> bool:
+        enabled = (config.get("rules", {}) or {}).get("enabled", DEFAULT_ENABLED_RULES)
+        if self.name not in enabled:
+            return False
+        if self.enabled_by:
+            section, key = self.enabled_by
+            return bool((config.get(section, {}) or {}).get(key, True))
+        return True
+
+
+def register_rule(name, result_key, needs=(), enabled_by=None):
+    def decorator(fn):
+        RULES[name] = Rule(name, fn, result_key, needs, enabled_by)
+        return fn
+    return decorator
+
+
+def register_intermediate(name, needs=()):
+    def decorator(fn):
+        INTERMEDIATES[name] = (fn, tuple(needs))
+        return fn
+    return decorator
+
+
+class AuditContext:
+    """
+    One evaluation over one invoice frame: holds the inputs and memoizes
+    every intermediate column the first time a rule asks for it
+    (each computed under its own "intermediate:<name>" span).
+    """
+
+    def __init__(self, invoices: pd.DataFrame, vendors, config: dict):
+        self.invoices = invoices
+        self.vendors = vendors
+        self.config = config
+        self._values = {}
+
+    def get(self, name):
+        if name not in self._values:
+            fn, needs = INTERMEDIATES[name]
+            for dep in needs:
+                self.get(dep)
+            # Dependencies are already computed, so the span times this column alone
+            with span(f"intermediate:{name}", rows=len(self.invoices)):
+                self._values[name] = fn(self)
+        return self._values[name]
+
+    def has(self, name) -> bool:
+        return name in self._values
+
+
+class AuditPlan:
+    """Enabled rules (in registry order) + the intermediates they share."""
+
+    def __init__(self, rules, config):
+        self.rules = list(rules)
+        self.config = config
+        self.by_result_key = {r.result_key: r for r in self.rules}
+
+    @property
+    def intermediates(self):
+        order = []
+
+        def visit(name):
+            for dep in INTERMEDIATES[name][1]:
+                visit(dep)
+            if name not in order:
+                order.append(name)
+
+        for rule in self.rules:
+            for name in rule.needs:
+                visit(name)
+        return order
+
+    def is_enabled(self, result_key) -> bool:
+        return result_key in self.by_result_key
+
+    def evaluate_rule(self, ctx: AuditContext, result_key) -> np.ndarray:
+        """Mask for one rule; disabled rules flag nothing."""
+        rule = self.by_result_key.get(result_key)
+        if rule is None:
+            return np.zeros(len(ctx.invoices), dtype=bool)
+        for name in rule.needs:  # computed (and timed) outside the rule's own span
+            ctx.get(name)
+        with span(f"rule:{rule.name}", rows=len(ctx.invoices)):
+            mask = np.asarray(rule.fn(ctx, self.config), dtype=bool)
+        return mask
+
+    def evaluate(self, invoices: pd.DataFrame, vendors) -> tuple:
+        """Single pass: shared intermediates once, then every enabled rule. Returns (ctx, masks)."""
+        ctx = AuditContext(invoices, vendors, self.config)
+        for name in self.intermediates:
+            ctx.get(name)
+        masks = {rule.result_key: self.evaluate_rule(ctx, rule.result_key) for rule in self.rules}
+        return ctx, masks
+
+
+def compile_plan(config: dict) -> AuditPlan:
+    """Reads rules.enabled (+ legacy toggles) from the config and builds the plan."""
+    unknown = set((config.get("rules", {}) or {}).get("enabled", ())) - set(RULES)
+    if unknown:
+        raise ValueError(f"❌ Unknown rule(s) in config: {sorted(unknown)}. Known: {sorted(RULES)}")
+    return AuditPlan([r for r in RULES.values() if r.is_enabled(config)], config)
+
+
+# ----------------------------
+# Shared intermediates
+# ----------------------------
+@register_intermediate("invoice_amount")
+def _invoice_amount(ctx):
+    return as_numeric(ctx.invoices.get("InvoiceAmount"))
+
+
+@register_intermediate("po_amount")
+def _po_amount(ctx):
+    return as_numeric(ctx.invoices.get("PO_Amount"))
+
+
+@register_intermediate("variance", needs=("invoice_amount", "po_amount"))
+def _variance(ctx):
+    amount, po = ctx.get("invoice_amount"), ctx.get("po_amount")
+    # Avoid divide-by-zero
+    return (amount - po).abs() / po.replace({0: pd.NA})
+
+
+@register_intermediate("invoice_date")
+def _invoice_date(ctx):
+    if "InvoiceDate" not in ctx.invoices.columns:
+        return pd.Series(pd.NaT, index=ctx.invoices.index)
+    return as_datetime(ctx.invoices["InvoiceDate"])
+
+
+@register_intermediate("duplicate_match", needs=("invoice_amount", "invoice_date"))
+def _duplicate_match(ctx):
+    """(original position or -1, "exact" | "near" | "") per row, see src/duplicates.py."""
+    vendor_ids = ctx.invoices["VendorID"] if "VendorID" in ctx.invoices.columns else [None] * len(ctx.invoices)
+    return find_duplicates(
+        vendor_ids, ctx.get("invoice_amount"), ctx.get("invoice_date"), **duplicate_settings(ctx.config)
+    )
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+@register_rule("ghost_vendors", result_key="ghosts", enabled_by=("risk_settings", "detect_ghost_vendors"))
+def ghost_vendors(ctx, config):
+    """Invoice VendorID not found in the vendor master."""
+    return ctx.vendors.ghost_mask(ctx.invoices)
+
+
+@register_rule("po_variance", result_key="failures", needs=("variance",))
+def po_variance(ctx, config):
+    """abs(InvoiceAmount - PO_Amount) / PO_Amount above financial_limits.max_po_variance."""
+    limit = float(config.get("financial_limits", {}).get("max_po_variance", 0.10))
+    return (ctx.get("variance") > limit).fillna(False).to_numpy(dtype=bool)
+
+
+@register_rule("high_value", result_key="high_value", needs=("invoice_amount",))
+def high_value(ctx, config):
+    """InvoiceAmount at/above financial_limits.high_value_threshold."""
+    threshold = float(config.get("financial_limits", {}).get("high_value_threshold", 15000))
+    return (ctx.get("invoice_amount") >= threshold).fillna(False).to_numpy(dtype=bool)
+
+
+@register_rule("duplicate_invoices", result_key="duplicates", needs=("duplicate_match",))
+def duplicate_invoices(ctx, config):
+    """
+    Same VendorID and amount (exact), or amounts within duplicate_settings.amount_tolerance
+    and InvoiceDate within date_window_days (near). Flags the later invoice of each pair.
+    """
+    original, _ = ctx.get("duplicate_match")
+    return original >= 0
@@ -0,0 +1,99 @@
+import threading
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from src.ai_auditor import scan_notes_for_risk
+
+# ----------------------------
+# Background FOIP/PII scans
+# ----------------------------
+# The dashboard must not freeze while every note goes through BERT. A
+# BackgroundScan runs scan_notes_for_risk() on a worker thread (the model
+# releases the GIL during inference, and workers > 1 still fans out to
+# processes) and exposes a snapshot the UI can poll: progress, the findings
+# answered so far, and a cancel switch.
+
+FINDING_COLUMNS = ["InvoiceID", "RiskContent", "DetectedFlags"]
+
+
+class BackgroundScan:
+    """
+    scan = BackgroundScan(invoices, brain_loader=..., cache=..., **options).start()
+    scan.snapshot()  -> {"status", "done", "total", "findings", "error", "elapsed_s"}
+    scan.cancel()    -> stops after the current model batch
+    status: "running" | "done" | "cancelled" | "failed"
+    """
+
+    def __init__(self, df: pd.DataFrame, recorder=None, **scan_kwargs):
+        self.df = df
+        self.recorder = recorder
+        self.scan_kwargs = scan_kwargs
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self._findings = pd.DataFrame(columns=FINDING_COLUMNS)
+        self._status = "running"
+        self._error = None
+        self._started = None
+        self._finished = None
+        self._thread = threading.Thread(target=self._run, name="foip-scan", daemon=True)
+
+    def start(self) -> "BackgroundScan":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _on_progress(self, done, total, partial):
+        with self._lock:
+            self._done, self._total, self._findings = done, total, partial
+
+    def _run(self):
+        try:
+            with self.recorder.activate() if self.recorder else nullcontext():
+                findings = scan_notes_for_risk(
+                    self.df, progress=self._on_progress, cancel=self._cancel, **self.scan_kwargs
+                )
+            stats = findings.attrs.get("scan_stats", {})
+            with self._lock:
+                self._findings = findings
+                self._status = "cancelled" if stats.get("cancelled") else "done"
+        except Exception as e:  # surfaced to the UI instead of dying silently in the thread
+            with self._lock:
+                self._status = "failed"
+                self._error = f"{type(e).__name__}: {e}"
+        finally:
+            self._finished = time.perf_counter()
+            if self.recorder is not None:
+                self.recorder.meta["status"] = self._status
+                self.recorder.save()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def join(self, timeout=None) -> "BackgroundScan":
+        self._thread.join(timeout)
+        return self
+
+    @property
+    def status(self) -> str:
+        with self._lock:
+            return self._status
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            end = self._finished or time.perf_counter()
+            return {
+                "status": self._status,
+                "done": self._done,
+                "total": self._total,
+                "findings": self._findings,
+                "error": self._error,
+                "elapsed_s": end - self._started if self._started else 0.0,
+            }
@@ -0,0 +1,289 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Allow `python src/scan_service.py` as well as `from src import scan_service`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.ner_batching import DEFAULT_MAX_TOKENS, DEFAULT_WINDOW_OVERLAP, TokenLayouts, run_ner_bucketed
+from src.ner_cache import entities_to_json
+
+# ----------------------------
+# Warm FOIP/PII scan service
+# ----------------------------
+# Loading BERT takes longer than scanning a small daily dump, and every CLI run
+# and every fresh Streamlit process used to pay for it. The service loads the
+# pipeline once and answers scans over localhost HTTP:
+#
+#   GET  /health   -> {"model", "batch_size", "max_tokens", "window_overlap", "stats"}
+#   POST /scan     {"texts": [...]} -> {"entities": [[...], ...]}  (same order)
+#
+# Requests from concurrent clients (CLI, dashboard sessions, batch jobs) are
+# merged into micro-batches: the batcher waits for the first request, then
+# keeps collecting until batch_size notes are queued or max_latency_ms has
+# passed since that first request, whichever comes first. Distinct notes of the
+# whole group go through run_ner_bucketed() together (length-sorted, windowed).
+#
+# Clients: scan_notes_for_risk(service=url) uses a running service whose model
+# matches its backend and falls back to loading the model in-process otherwise.
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8765"
+DEFAULT_MAX_LATENCY_MS = 20
+CLIENT_CHUNK = 256        # notes per /scan request (keeps progress/cancel responsive)
+HEALTH_TIMEOUT_S = 0.5    # a service that is not running fails fast
+SCAN_TIMEOUT_S = 600
+
+
+class ServiceUnavailable(RuntimeError):
+    """The scan service could not be reached or answered with an error."""
+
+
+class _Request:
+    def __init__(self, texts):
+        self.texts = texts
+        self.arrived = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    batcher = MicroBatcher(nlp, batch_size=32, max_latency_ms=20).start()
+    batcher.submit(texts) -> one entity list per text (blocks until answered)
+
+    One thread owns the model; submit() may be called from any number of threads.
+    """
+
+    def __init__(self, nlp, batch_size=32, max_latency_ms=DEFAULT_MAX_LATENCY_MS,
+                 max_tokens=DEFAULT_MAX_TOKENS, window_overlap=DEFAULT_WINDOW_OVERLAP):
+        self.nlp = nlp
+        self.batch_size = max(int(batch_size or 1), 1)
+        self.max_latency_s = max(float(max_latency_ms), 0.0) / 1000
+        self.max_tokens = int(max_tokens)  # as configured; layouts.max_tokens is clamped to the model
+        self.layouts = TokenLayouts(nlp, max_tokens=max_tokens, overlap=window_overlap)
+        self.stats = {"requests": 0, "batches": 0, "notes": 0, "max_group": 0}
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="ner-batcher", daemon=True)
+
+    def start(self) -> "MicroBatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, texts) -> list:
+        request = _Request(list(texts))
+        if not request.texts:
+            return []
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        """First queued request plus whatever arrives before the batch fills or the deadline passes."""
+        first = self._queue.get()
+        if first is None:
+            return []
+        group, queued = [first], len(first.texts)
+        deadline = first.arrived + self.max_latency_s
+        while queued < self.batch_size:
+            wait = deadline - time.perf_counter()
+            if wait <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=wait)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stop.set()
+                break
+            group.append(request)
+            queued += len(request.texts)
+        return group
+
+    def _loop(self):
+        while not self._stop.is_set():
+            group = self._collect()
+            if not group:
+                continue
+            texts = list(dict.fromkeys(t for r in group for t in r.texts))
+            try:
+                by_text = dict(zip(texts, run_ner_bucketed(self.nlp, texts, self.batch_size, self.layouts)))
+                for request in group:
+                    request.result = [entities_to_json(by_text[t]) for t in request.texts]
+            except Exception as e:  # handed to every waiting client instead of killing the batcher
+                for request in group:
+                    request.error = e
+            finally:
+                self.stats["requests"] += len(group)
+                self.stats["batches"] += 1
+                self.stats["notes"] += len(texts)
+                self.stats["max_group"] = max(self.stats["max_group"], len(group))
+                for request in group:
+                    request.done.set()
+
+
+def make_server(batcher, model, host="127.0.0.1", port=8765) -> ThreadingHTTPServer:
+    """HTTP front end for a started MicroBatcher (port 0 = any free port)."""
+    info = {
+        "model": model,
+        "batch_size": batcher.batch_size,
+        "max_tokens": batcher.max_tokens,
+        "window_overlap": batcher.layouts.overlap,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "not found"})
+            self._reply(200, {**info, "stats": dict(batcher.stats)})
+
+        def do_POST(self):
+            if self.path != "/scan":
+                return self._reply(404, {"error": "not found"})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = payload["texts"]
+                if not all(isinstance(t, str) for t in texts):
+                    raise TypeError("texts must be strings")
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+            try:
+                self._reply(200, {"entities": batcher.submit(texts)})
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, *args):
+            pass  # one line per request would drown the service log
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+class ScanClient:
+    """
+    client = ScanClient("http://127.0.0.1:8765")
+    client.health()      -> service info (raises ServiceUnavailable)
+    client.scan(texts)   -> one entity list per text
+    """
+
+    def __init__(self, url=DEFAULT_SERVICE_URL, timeout=SCAN_TIMEOUT_S):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path, payload=None, timeout=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(
+            self.url + path, data=data, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise ServiceUnavailable(f"{self.url}{path} -> HTTP {e.code}: {e.read()[:200]!r}") from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise ServiceUnavailable(f"{self.url}{path}: {e}") from e
+
+    def health(self) -> dict:
+        return self._call("/health", timeout=HEALTH_TIMEOUT_S)
+
+    def scan(self, texts) -> list:
+        entities = self._call("/scan", {"texts": list(texts)})["entities"]
+        if len(entities) != len(texts):
+            raise ServiceUnavailable(f"{self.url}/scan answered {len(entities)} of {len(texts)} notes")
+        return entities
+
+
+def connect_service(service, model=None, max_tokens=None, window_overlap=None):
+    """
+    A ScanClient for `service` (URL or client) when it is up and reads notes the way
+    the caller would (same model tag and configured max_tokens / window_overlap);
+    None otherwise, so the caller falls back to loading the model in-process.
+    """
+    if not service:
+        return None
+    client = service if isinstance(service, ScanClient) else ScanClient(str(service))
+    try:
+        info = client.health()
+    except ServiceUnavailable:
+        return None
+    expected = {"model": model, "max_tokens": max_tokens, "window_overlap": window_overlap}
+    mismatched = {k: info.get(k) for k, v in expected.items() if v is not None and info.get(k) != v}
+    if mismatched:
+        print(f"   ⚠️  Scan service at {client.url} differs ({mismatched}); scanning in-process.")
+        return None
+    return client
+
+
+def service_settings(config: dict) -> dict:
+    """ai_settings.service_url / service_max_latency_ms from the audit config."""
+    ai = config.get("ai_settings", {}) or {}
+    return {
+        "url": ai.get("service_url") or None,
+        "max_latency_ms": float(ai.get("service_max_latency_ms", DEFAULT_MAX_LATENCY_MS)),
+    }
+
+
+if __name__ == "__main__":
+    from urllib.parse import urlparse
+
+    from src.rule_engine import load_config
+    from src.ai_auditor import BACKENDS, load_brain_for_backend, model_tag, scan_options_from_config
+
+    parser = argparse.ArgumentParser(description="Keep the NER model warm and serve FOIP/PII scans on localhost.")
+    parser.add_argument("--config", default="config/audit_rules.yaml")
+    parser.add_argument("--port", type=int, default=None, help="Port (default: from ai_settings.service_url).")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="NER inference backend (overrides ai_settings.backend).")
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="Longest a request waits for others to share its batch.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.backend is not None:
+        config.setdefault("ai_settings", {})["backend"] = args.backend
+    options = scan_options_from_config(config)
+    settings = service_settings(config)
+    url = urlparse(settings["url"] or DEFAULT_SERVICE_URL)
+    latency = args.max_latency_ms if args.max_latency_ms is not None else settings["max_latency_ms"]
+
+    nlp = load_brain_for_backend(options["backend"])
+    batcher = MicroBatcher(
+        nlp, batch_size=options["batch_size"], max_latency_ms=latency,
+        max_tokens=options["max_tokens"], window_overlap=options["window_overlap"],
+    ).start()
+    server = make_server(batcher, model_tag(options["backend"]), host=url.hostname or "127.0.0.1",
+                         port=args.port or url.port or 8765)
+    host, port = server.server_address[:2]
+    print(f"🛰️  Scan service ready on http://{host}:{port} "
+          f"(backend={options['backend']}, batch_size={batcher.batch_size}, max latency {latency:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Scan service stopped.")
+    finally:
+        server.server_close()
+        batcher.stop()
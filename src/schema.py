@@ -0,0 +1,138 @@
+import hashlib
+import json
+
+import pandas as pd
+
+# ----------------------------
+# Invoice schema
+# ----------------------------
+# Left to inference, every text column of an invoice dump is an object column:
+# one Python str per cell (50+ bytes each), with VendorID / VendorName /
+# Department repeated on every row, and amounts that arrive as text stay
+# text until each consumer coerces them again. On 10M-row dumps the object
+# columns are most of the memory. The schema is applied once, at ingestion
+# (load_table(..., schema=INVOICE_SCHEMA)), and the typed frame is what the
+# ingestion cache stores:
+#
+#   key      categorical: int codes + one copy of each distinct value
+#   id       Arrow-backed strings (unique per row, so categories would not help)
+#   text     Arrow-backed strings: one buffer per column, no per-cell objects
+#   amount   float64; cells that are present but not numbers become NaN and are counted
+#   date     datetime64; unparseable cells become NaT and are counted
+#
+# Without pyarrow, id/text columns use pandas' own "string" dtype.
+# Columns the schema does not name are left as they are. The typed frame's
+# attrs["schema_report"] holds memory before/after and invalid cells per column.
+
+REQUIRED_COLUMNS = {
+    "InvoiceID",
+    "VendorID",
+    "VendorName",
+    "InvoiceAmount",
+    "PO_Amount",
+    "Notes",
+}
+
+INVOICE_SCHEMA = {
+    "InvoiceID": "id",
+    "VendorID": "key",
+    "VendorName": "key",
+    "Department": "key",
+    "InvoiceDate": "date",
+    "InvoiceAmount": "amount",
+    "PO_Amount": "amount",
+    "Notes": "text",
+}
+
+COLUMN_KINDS = ("key", "id", "text", "amount", "date")
+SCHEMA_VERSION = 1  # bump when a kind's conversion changes (invalidates cached typed copies)
+
+
+def string_dtype() -> str:
+    """Arrow-backed strings when pyarrow is installed, pandas' python strings otherwise."""
+    try:
+        import pyarrow  # noqa: F401
+        return "string[pyarrow]"
+    except ImportError:
+        return "string"
+
+
+def schema_tag(schema: dict) -> str:
+    """Short id of a schema, used to keep typed cache copies apart from untyped ones."""
+    payload = json.dumps({"version": SCHEMA_VERSION, "columns": schema}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:10]
+
+
+def as_numeric(values):
+    """pd.to_numeric(errors="coerce"), skipped for columns the schema already typed."""
+    if isinstance(values, pd.Series) and pd.api.types.is_numeric_dtype(values.dtype):
+        return values
+    return pd.to_numeric(values, errors="coerce")
+
+
+def as_datetime(values):
+    """pd.to_datetime(errors="coerce"), skipped for columns the schema already typed."""
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    return pd.to_datetime(values, errors="coerce")
+
+
+def _only_strings(values: pd.Series) -> pd.Series:
+    """Non-text cells (numbers, dates in a text column) become missing instead of "123"."""
+    if values.dtype != object:
+        return values
+    return values.where(values.map(lambda v: isinstance(v, str)).astype(bool))
+
+
+def _convert(values: pd.Series, kind: str, text_dtype: str) -> pd.Series:
+    if kind == "key":
+        return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    if kind == "id":
+        return values.astype(text_dtype)
+    if kind == "text":
+        return _only_strings(values).astype(text_dtype)
+    if kind == "amount":
+        return as_numeric(values).astype("float64")
+    if kind == "date":
+        return as_datetime(values)
+    raise ValueError(f"❌ Unknown column kind {kind!r}. Use one of {COLUMN_KINDS}")
+
+
+def apply_invoice_schema(df: pd.DataFrame, schema=None) -> pd.DataFrame:
+    """
+    Returns a typed copy of df (columns missing from df are skipped).
+    attrs["schema_report"] = {"rows", "before_mb", "after_mb", "invalid": {column: cells}}.
+    """
+    schema = INVOICE_SCHEMA if schema is None else schema
+    text_dtype = string_dtype()
+    before = df.memory_usage(deep=True).sum()
+
+    typed = df.copy(deep=False)
+    invalid = {}
+    for column, kind in schema.items():
+        if column not in typed.columns:
+            continue
+        original = typed[column]
+        converted = _convert(original, kind, text_dtype)
+        if kind in ("amount", "date"):
+            bad = int((original.notna() & converted.isna()).sum())
+            if bad:
+                invalid[column] = bad
+        typed[column] = converted
+
+    typed.attrs["schema_report"] = {
+        "rows": int(len(typed)),
+        "before_mb": round(before / 1024**2, 2),
+        "after_mb": round(typed.memory_usage(deep=True).sum() / 1024**2, 2),
+        "invalid": invalid,
+    }
+    return typed
+
+
+def format_schema_report(report: dict) -> str:
+    """One console line for a schema_report."""
+    line = (f"🧱 Typed schema: {report['rows']} rows, {report['before_mb']:.1f} MB -> "
+            f"{report['after_mb']:.1f} MB in memory")
+    if report["invalid"]:
+        line += " | ⚠️  invalid cells set to missing: " + ", ".join(f"{c}={n}" for c, n in report["invalid"].items())
+    return line
@@ -0,0 +1,266 @@
+import cProfile
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ----------------------------
+# Run instrumentation
+# ----------------------------
+# A RunRecorder collects timed spans (ingestion, each rule, model load, NER,
+# export...) and latency histograms for one run, then writes them as a JSON
+# run record next to the tee'd logs in data/audit_reports/run_logs/.
+#
+# Library code never needs a recorder passed in: it calls the module-level
+# span()/observe() helpers, which are no-ops unless a recorder is active
+# on the calling thread.
+#
+#   recorder = RunRecorder("rule_engine")
+#   with recorder.activate():
+#       with span("ingest") as s:
+#           df = load_table(path)
+#           s.rows = len(df)
+#   recorder.save()
+#
+# Any stage can also be profiled: profile={"ner_inference": "cprofile"} dumps
+# a .prof file for that span; "tracemalloc" records its peak traced memory and
+# top allocation sites.
+
+DEFAULT_RUN_LOG_DIR = "data/audit_reports/run_logs"
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# Histogram bucket upper bounds in ms (last bucket is open-ended)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def parse_profile_args(values) -> dict:
+    """
+    ['ner_inference', 'rule:po_variance:tracemalloc'] ->
+    {'ner_inference': 'cprofile', 'rule:po_variance': 'tracemalloc'}
+    """
+    profile = {}
+    for value in values or ():
+        stage, _, mode = value.rpartition(":")
+        if mode not in PROFILE_MODES:
+            stage, mode = value, "cprofile"
+        profile[stage] = mode
+    return profile
+
+
+class Span:
+    """One timed stage. Set .rows (and any extra attrs) inside the with-block."""
+
+    def __init__(self, name, rows=None, **attrs):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs
+        self.start_s = None
+        self.duration_s = None
+        self.peak_rss_mb = None
+        self.profile = None
+
+    def to_dict(self) -> dict:
+        out = {
+            "name": self.name,
+            "start_s": round(self.start_s, 6),
+            "duration_s": round(self.duration_s, 6),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / self.duration_s, 1) if self.rows and self.duration_s else None,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.profile:
+            out["profile"] = self.profile
+        return out
+
+
+class Histogram:
+    """Latency samples; summarised as count/mean/percentiles + fixed ms buckets."""
+
+    def __init__(self):
+        self.values = []
+
+    def add(self, value) -> None:
+        self.values.append(float(value))
+
+    def summary(self) -> dict:
+        if not self.values:
+            return {"count": 0}
+        values = np.asarray(self.values)
+        counts = np.bincount(np.searchsorted(LATENCY_BUCKETS_MS, values), minlength=len(LATENCY_BUCKETS_MS) + 1)
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "count": int(len(values)),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)),
+            "max": float(values.max()),
+            "buckets_ms": {label: int(c) for label, c in zip(labels, counts) if c},
+        }
+
+
+class RunRecorder:
+    """Spans + histograms for one run, written as run_<name>_<timestamp>.json."""
+
+    def __init__(self, name, log_dir=DEFAULT_RUN_LOG_DIR, profile=None):
+        self.name = name
+        self.log_dir = log_dir
+        self.profile = dict(profile or {})
+        self.started_at = datetime.now()
+        self.spans = []
+        self.histograms = {}
+        self.meta = {}
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stamp = self.started_at.strftime("%Y%m%d_%H%M%S")
+
+    @contextmanager
+    def span(self, name, rows=None, **attrs):
+        s = Span(name, rows, **attrs)
+        mode = self.profile.get(name) or self.profile.get("*")
+        profiler = None
+        traced = False
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            traced = True
+
+        s.start_s = time.perf_counter() - self._t0
+        try:
+            yield s
+        finally:
+            s.duration_s = time.perf_counter() - self._t0 - s.start_s
+            s.peak_rss_mb = peak_rss_mb()
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.log_dir, exist_ok=True)
+                prof_path = os.path.join(self.log_dir, f"profile_{self.name}_{name.replace(':', '-')}_{self._stamp}.prof")
+                profiler.dump_stats(prof_path)
+                s.profile = {"mode": "cprofile", "path": prof_path}
+            elif traced:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                s.profile = {
+                    "mode": "tracemalloc",
+                    "peak_traced_mb": peak / (1024 * 1024),
+                    "top_allocations": [str(stat) for stat in snapshot.statistics("lineno")[:5]],
+                }
+            with self._lock:
+                self.spans.append(s)
+
+    def observe(self, metric, value) -> None:
+        with self._lock:
+            self.histograms.setdefault(metric, Histogram()).add(value)
+
+    @contextmanager
+    def activate(self):
+        """Makes this the recorder behind span()/observe() on the current thread."""
+        previous = active_recorder()
+        _LOCAL.recorder = self
+        try:
+            yield self
+        finally:
+            _LOCAL.recorder = previous
+
+    def stage_totals(self) -> dict:
+        """Spans aggregated by name (streaming runs emit one span per chunk)."""
+        totals = {}
+        for s in self.spans:
+            t = totals.setdefault(s.name, {"calls": 0, "duration_s": 0.0, "rows": 0})
+            t["calls"] += 1
+            t["duration_s"] += s.duration_s
+            t["rows"] += s.rows or 0
+        for t in totals.values():
+            t["rows_per_s"] = round(t["rows"] / t["duration_s"], 1) if t["rows"] and t["duration_s"] else None
+            t["duration_s"] = round(t["duration_s"], 6)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "run": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._t0, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "pid": os.getpid()},
+            "argv": sys.argv,
+            "meta": self.meta,
+            "stages": self.stage_totals(),
+            "spans": [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start_s)],
+            "histograms": {name: h.summary() for name, h in self.histograms.items()},
+        }
+
+    def save(self) -> str:
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, f"run_{self.name}_{self._stamp}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+
+class _NullSpan:
+    """Accepts the same attribute writes as Span, records nothing."""
+
+    def __init__(self):
+        self.rows = None
+        self.attrs = {}
+
+
+# Per thread, so a background job (e.g. the dashboard's AI scan) records into
+# its own run record instead of whichever run the UI thread is recording.
+_LOCAL = threading.local()
+
+
+@contextmanager
+def span(name, rows=None, **attrs):
+    """Times a stage on the active recorder (no-op when none is active)."""
+    recorder = active_recorder()
+    if recorder is None:
+        yield _NullSpan()
+        return
+    with recorder.span(name, rows, **attrs) as s:
+        yield s
+
+
+def observe(metric, value) -> None:
+    """Adds a sample (e.g. model-call latency in ms) to a histogram on the active recorder."""
+    recorder = active_recorder()
+    if recorder is not None:
+        recorder.observe(metric, value)
+
+
+def active_recorder():
+    return getattr(_LOCAL, "recorder", None)
+
+
+def recorder_from_config(name, config: dict, profile=None):
+    """telemetry_settings.run_records / run_log_dir from the audit config; None when disabled."""
+    settings = config.get("telemetry_settings", {}) or {}
+    if not settings.get("run_records", True):
+        return None
+    return RunRecorder(name, log_dir=settings.get("run_log_dir") or DEFAULT_RUN_LOG_DIR, profile=profile)
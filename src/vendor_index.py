@@ -0,0 +1,287 @@
+import argparse
+import difflib
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Allow `python src/vendor_index.py` as well as `from src.vendor_index import ...`.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# ----------------------------
+# Vendor Master Index
+# ----------------------------
+# The ghost vendor check only needs "is this VendorID in the master list?".
+# Joining the whole master onto every invoice to answer that copies every
+# column of both frames. Instead we build a hashed index of the master IDs
+# once (pd.Index keeps its hash table after the first lookup), save it next
+# to the other caches, and answer membership for a whole column at once.
+
+DEFAULT_INDEX_PATH = "data/cache/vendor_index.json"
+
+# Near-miss matching (closest legitimate vendor for a ghost):
+# IDs / names are normalised (case, separators, lookalike characters such as
+# 0/O and 1/I) and split into character trigrams. An inverted index maps each
+# trigram to the master entries containing it. A query only visits the
+# postings of its rarest trigrams -- enough to guarantee every entry whose
+# trigram Dice coefficient reaches CANDIDATE_DICE is found (prefix filtering).
+# Trigrams shared by most of the master (the "#VE"/"VEN"/"DOR" of VENDOR-NNN
+# IDs, made even more common by the lookalike folding) are never visited; they
+# still count towards the Dice score.
+# The best few candidates by Dice are then re-scored with an edit-based
+# similarity ratio (difflib), which separates one-character typos from IDs
+# that merely share a prefix such as "VENDOR-".
+NGRAM_SIZE = 3
+CANDIDATE_DICE = 0.5
+TOP_CANDIDATES = 10
+COMMON_GRAM_SHARE = 0.02   # trigrams in more than this share of entries are not visited...
+COMMON_GRAM_MIN = 64       # ...once they are in more than this many (small masters are scanned exactly)
+DEFAULT_MIN_SIMILARITY = 0.8
+_LOOKALIKES = str.maketrans({"0": "O", "1": "I", "5": "S", "8": "B", "$": "S", "|": "I"})
+
+
+def normalize_vendor_key(value) -> str:
+    """'Vend0r-001' -> 'VENDOROOI': upper-case, lookalikes folded, separators dropped."""
+    return re.sub(r"[^A-Z0-9]", "", str(value).upper().translate(_LOOKALIKES))
+
+
+def char_ngrams(value, n=NGRAM_SIZE) -> frozenset:
+    key = normalize_vendor_key(value)
+    if not key:
+        return frozenset()
+    padded = f"#{key}#"
+    return frozenset(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+class NgramIndex:
+    """
+    Inverted character n-gram index over (key, label) entries.
+    best_match(text, min_similarity) -> (label, similarity) or (None, 0.0)
+    """
+
+    def __init__(self, entries, n=NGRAM_SIZE):
+        self.n = n
+        self.labels = []
+        self.keys = []
+        self.grams = []
+        self.postings = {}
+        for key, label in entries:
+            grams = char_ngrams(key, n)
+            if not grams:
+                continue
+            entry = len(self.labels)
+            self.labels.append(label)
+            self.keys.append(normalize_vendor_key(key))
+            self.grams.append(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(entry)
+        self.common_postings = max(COMMON_GRAM_MIN, int(COMMON_GRAM_SHARE * len(self.labels)))
+
+    def candidates(self, query) -> set:
+        """
+        Entries that can share enough trigrams with `query` (a trigram set) to
+        reach CANDIDATE_DICE.
+
+        Dice >= t needs an overlap of at least t*|q|/(2-t) trigrams. Common grams
+        cover at most len(common) of it, so a match contains one of the
+        len(rare) - (overlap - len(common)) + 1 rarest other grams. When the common
+        grams alone could reach the overlap, every rare gram is visited and entries
+        sharing nothing but common grams (a bare "VENDOR-" prefix) are skipped.
+        """
+        min_overlap = max(1, math.ceil(CANDIDATE_DICE * len(query) / (2 - CANDIDATE_DICE)))
+        rarest = sorted(query, key=lambda g: len(self.postings.get(g, ())))
+        rare = [g for g in rarest if len(self.postings.get(g, ())) <= self.common_postings]
+        if not rare:
+            visit = rarest[: len(query) - min_overlap + 1]
+        else:
+            visit = rare[: len(rare) - max(min_overlap - (len(query) - len(rare)), 1) + 1]
+        candidates = set()
+        for gram in visit:
+            candidates.update(self.postings.get(gram, ()))
+        return candidates
+
+    def best_match(self, text, min_similarity=DEFAULT_MIN_SIMILARITY) -> tuple:
+        query = char_ngrams(text, self.n)
+        if not query:
+            return None, 0.0
+
+        candidates = self.candidates(query)
+
+        dice = sorted(
+            ((2 * len(query & self.grams[e]) / (len(query) + len(self.grams[e])), -e) for e in candidates),
+            reverse=True,
+        )
+        key = normalize_vendor_key(text)
+        best, best_score = None, 0.0
+        for score, neg_entry in dice[:TOP_CANDIDATES]:
+            if score < CANDIDATE_DICE:
+                break
+            ratio = difflib.SequenceMatcher(None, key, self.keys[-neg_entry]).ratio()
+            if ratio > best_score:
+                best, best_score = -neg_entry, ratio
+        if best is None or best_score < min_similarity:
+            return None, 0.0
+        return self.labels[best], best_score
+
+
+class VendorIndex:
+    """
+    Set of legitimate VendorIDs with vectorized membership lookups.
+
+    - VendorIndex.from_master(df) / load(path) / load_or_build(master_path)
+    - contains(values) -> bool array, ghost_mask(invoices) -> bool array
+    - add(ids) / remove(ids) for incremental updates, save(path) to persist
+    - closest(ids, names) -> closest legitimate vendor per (ghost) ID / name
+    """
+
+    def __init__(self, vendor_ids=(), source=None, vendor_names=None):
+        self._index = pd.Index(pd.unique(pd.Series(list(vendor_ids), dtype=object).dropna()))
+        # Fingerprint of the master file this index was built from (mtime/size)
+        self.source = source or {}
+        # VendorID -> VendorName, when the master has names (used for near-miss matching)
+        self.vendor_names = dict(vendor_names or {})
+        self._ngrams = None
+
+    @classmethod
+    def from_master(cls, master: pd.DataFrame, column="VendorID", source=None):
+        names = None
+        if "VendorName" in master.columns:
+            named = master[[column, "VendorName"]].dropna()
+            names = dict(zip(named[column], named["VendorName"].astype(str)))
+        return cls(master[column].tolist(), source=source, vendor_names=names)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(path) as f:
+            payload = json.load(f)
+        return cls(payload["vendor_ids"], source=payload.get("source"), vendor_names=payload.get("vendor_names"))
+
+    @classmethod
+    def load_or_build(cls, master_path, index_path=DEFAULT_INDEX_PATH):
+        """
+        Reuses the saved index while the master file is unchanged (same mtime + size);
+        otherwise rebuilds it from the master and saves it again.
+        """
+        stat = os.stat(master_path)
+        source = {"path": os.path.abspath(master_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+        if index_path and os.path.exists(index_path):
+            index = cls.load(index_path)
+            if index.source == source:
+                return index
+
+        master = pd.read_csv(master_path, usecols=lambda c: c in ("VendorID", "VendorName"))
+        index = cls.from_master(master, source=source)
+        if index_path:
+            index.save(index_path)
+        return index
+
+    def save(self, path=DEFAULT_INDEX_PATH) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump({"vendor_ids": self._index.tolist(), "source": self.source, "vendor_names": self.vendor_names}, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def add(self, vendor_ids) -> "VendorIndex":
+        self._index = self._index.append(pd.Index(list(vendor_ids), dtype=object)).unique()
+        self._ngrams = None
+        return self
+
+    def remove(self, vendor_ids) -> "VendorIndex":
+        removed = set(vendor_ids)
+        self._index = self._index.difference(pd.Index(list(removed), dtype=object), sort=False)
+        self.vendor_names = {k: v for k, v in self.vendor_names.items() if k not in removed}
+        self._ngrams = None
+        return self
+
+    def contains(self, values) -> np.ndarray:
+        """Vectorized membership: True where the value is a known VendorID."""
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            # Typed invoices: look up each distinct VendorID once, then index by the codes
+            values = pd.Categorical(values)
+            known = np.append(self._index.get_indexer(pd.Index(values.categories, dtype=object)) >= 0, False)
+            return known[values.codes]  # code -1 (missing) -> the trailing False
+        return self._index.get_indexer(pd.Index(values, dtype=object)) >= 0
+
+    def ghost_mask(self, invoices: pd.DataFrame, column="VendorID") -> np.ndarray:
+        """True for invoice rows whose VendorID is NOT in the master list."""
+        return ~self.contains(invoices[column])
+
+    def ngram_index(self) -> NgramIndex:
+        """Trigram index over the master IDs and names (built on first use)."""
+        if self._ngrams is None:
+            entries = [(v, (v, "id")) for v in self._index]
+            entries += [(name, (v, "name")) for v, name in self.vendor_names.items() if v in self._index]
+            self._ngrams = NgramIndex(entries)
+        return self._ngrams
+
+    def closest(self, vendor_ids, vendor_names=None, min_similarity=DEFAULT_MIN_SIMILARITY) -> pd.DataFrame:
+        """
+        Closest legitimate vendor for each row (by ID, or by name when that scores higher).
+        Returns ClosestVendor / VendorSimilarity / MatchedOn aligned with the input;
+        ClosestVendor is None when nothing reaches min_similarity.
+        Each distinct (ID, name) pair is looked up once.
+        """
+        ids = pd.Series(list(vendor_ids), dtype=object)
+        names = pd.Series(list(vendor_names), dtype=object) if vendor_names is not None else pd.Series([None] * len(ids), dtype=object)
+        index = self.ngram_index()
+
+        found = {}
+        rows = []
+        for key in zip(ids, names):
+            if key not in found:
+                best = (None, 0.0, None)
+                for text in key:
+                    if text is None or (isinstance(text, float) and math.isnan(text)):
+                        continue
+                    label, score = index.best_match(text, min_similarity)
+                    if label is not None and score > best[1]:
+                        best = (label[0], score, label[1])
+                found[key] = best
+            rows.append(found[key])
+        out = pd.DataFrame(rows, columns=["ClosestVendor", "VendorSimilarity", "MatchedOn"])
+        out["VendorSimilarity"] = out["VendorSimilarity"].round(3)
+        return out
+
+    def fingerprint(self) -> str:
+        """sha256 of the sorted VendorIDs (changes whenever the master set changes)."""
+        ids = sorted(str(v) for v in self._index)
+        return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+
+    def __contains__(self, vendor_id) -> bool:
+        return vendor_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def as_vendor_index(master) -> VendorIndex:
+    """Accepts either a ready VendorIndex or a master DataFrame."""
+    return master if isinstance(master, VendorIndex) else VendorIndex.from_master(master)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the saved vendor master index.")
+    parser.add_argument("--master", default="data/raw_erp_dump/vendor_master.csv")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--add", nargs="*", default=[], help="VendorIDs to add to the saved index.")
+    parser.add_argument("--remove", nargs="*", default=[], help="VendorIDs to remove from the saved index.")
+    args = parser.parse_args()
+
+    if args.add or args.remove:
+        index = VendorIndex.load(args.index) if os.path.exists(args.index) else VendorIndex()
+        index.add(args.add).remove(args.remove).save(args.index)
+        print(f"✅ Vendor index updated: {len(index)} vendors -> {args.index}")
+    else:
+        index = VendorIndex.load_or_build(args.master, args.index)
+        print(f"✅ Vendor index ready: {len(index)} vendors -> {args.index}")